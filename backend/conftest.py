@@ -0,0 +1,9 @@
+"""pytest setup: run mastery (and server, which imports it) on a scratch store."""
+import os
+import tempfile
+
+# must happen before mastery is imported: it opens DB_PATH at import
+os.environ.setdefault("MASTERY_DB", os.path.join(tempfile.mkdtemp(prefix="mastery-test-"), "mastery.db"))
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")   # server builds a client; tests never call out
+
+collect_ignore = ["test_server.py", "test_readweaver.py", "weave_test.py"]   # manual scripts, need a live server
@@ -1,10 +1,12 @@
 # mastery.py  ––  semantic-search version
 # ----------------------------------------------------------------------
-import sqlite3, pathlib, time, threading, struct
+import sqlite3, pathlib, time, threading, sys, json, atexit, os
+from collections import OrderedDict
 from contextlib import contextmanager
 from typing import List, Dict, Tuple, Optional
 
 import numpy as np
+import torch
 from sentence_transformers import SentenceTransformer
 import faiss                     # CPU build is fine for small indices
 import logging
@@ -12,23 +14,130 @@ import logging
 # Set up a module-level logger. Users can configure logging level externally.
 logger = logging.getLogger(__name__)
 
-DB_PATH = pathlib.Path(__file__).with_suffix(".db")
+# MASTERY_DB points the whole store (tests, scratch runs) somewhere else
+DB_PATH = pathlib.Path(os.getenv("MASTERY_DB") or pathlib.Path(__file__).with_suffix(".db"))
+INDEX_PATH = DB_PATH.with_suffix(".faiss")        # trained index, reused across boots
+ROWS_PATH = DB_PATH.with_suffix(".faiss.json")    # concept of each INDEX_PATH row
+VEC_PATH = DB_PATH.with_suffix(".vecs")           # one int8 record per concept
 
 # ─────────────────────────────── embeddings & index ────────────────────
-EMBEDDER = SentenceTransformer("intfloat/e5-small-v2")
+EMBED_MODEL  = "intfloat/e5-small-v2"
+EMBED_DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+_EMBEDDERS: Dict[Tuple[str, str], SentenceTransformer] = {}
+_EMBEDDERS_LOCK = threading.Lock()
+
+def _get_embedder(
+    model: str = EMBED_MODEL,
+    device: str = EMBED_DEVICE,
+) -> SentenceTransformer:
+    """Load, warm up and cache one encoder per (model, device)."""
+    key = (model, device)
+    embedder = _EMBEDDERS.get(key)
+    if embedder is None:
+        with _EMBEDDERS_LOCK:              # double-checked: load only once
+            embedder = _EMBEDDERS.get(key)
+            if embedder is None:
+                embedder = SentenceTransformer(model, device=device)
+                if device == "cuda":
+                    embedder.half()
+                if not getattr(embedder.tokenizer, "is_fast", True):
+                    logger.warning("%s is using a slow tokenizer", model)
+                # first encode pays kernel / allocator setup – do it now
+                embedder.encode(["warmup"], normalize_embeddings=True)
+                _EMBEDDERS[key] = embedder
+    return embedder
+
+EMBEDDER = _get_embedder()
 EMBED_DIM = EMBEDDER.get_sentence_embedding_dimension()
-FAISS_LOCK = threading.Lock()          # protects index rebuild / search
-FAISS_INDEX: Optional[faiss.IndexFlatIP] = None   # built lazily
+# on-disk layout of VEC_PATH: int8 codes + one float32 scale (388 B / row)
+_VEC_DTYPE = np.dtype([("q", np.int8, (EMBED_DIM,)), ("scale", np.float32)])
+
+class _RWLock:
+    """Many concurrent readers or one writer; a waiting writer goes first."""
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writers_waiting = 0
+        self._writing = False
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writing or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writing or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+FAISS_LOCK = _RWLock()      # searches share it; rebuild / add take it alone
+FAISS_INDEX: Optional[faiss.Index] = None         # loaded / built lazily
+
+IVF_MIN_ROWS = 1000      # below this HNSW is exact enough and needs no training
+IVF_NPROBE   = 8         # IVF cells visited per query
+REBUILD_EVERY = 256      # incremental adds before a full retrain / rebuild
+_PENDING_ADDS = 0        # adds since the last rebuild
+SAVE_EVERY_SECS = 30.0   # how often the background saver checks for changes
+_UNSAVED_ADDS = 0        # adds not yet in INDEX_PATH
+_SAVE_LOCK = threading.Lock()   # one save at a time
 
 # ------------------------------------------------------------------ #
 # 1 .  Low-level storage helpers                                    #
 # ------------------------------------------------------------------ #
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",         # safe under WAL, no fsync per commit
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",        # 256 MiB
+    "PRAGMA cache_size=-65536",          # 64 MiB
+)
+_LOCAL = threading.local()               # one long-lived connection per thread
+
+def _connect() -> sqlite3.Connection:
+    cx = sqlite3.connect(DB_PATH, isolation_level=None)   # autocommit
+    for pragma in _PRAGMAS:
+        cx.execute(pragma)
+    return cx
+
+@contextmanager
+def _conn():
+    """Yield this thread's pooled connection (autocommit; reads only)."""
+    cx = getattr(_LOCAL, "cx", None)
+    if cx is None:
+        cx = _LOCAL.cx = _connect()
+    yield cx
+
 @contextmanager
-def _conn(path: pathlib.Path = DB_PATH):
-    with sqlite3.connect(path) as cx:
-        cx.execute("PRAGMA journal_mode=WAL")
-        yield cx
-        cx.commit()
+def _tx():
+    """Yield the pooled connection inside ``BEGIN IMMEDIATE … COMMIT``."""
+    with _conn() as cx:
+        cx.execute("BEGIN IMMEDIATE")
+        try:
+            yield cx
+        except BaseException:
+            cx.execute("ROLLBACK")
+            raise
+        cx.execute("COMMIT")
 
 def _init_schema() -> None:
     with _conn() as cx:
@@ -40,58 +149,297 @@ def _init_schema() -> None:
               weight      REAL,
               ts          INTEGER
             );
+            -- covers mastery_scores: index-only scan, no row fetches
+            DROP INDEX IF EXISTS idx_events_user_concept_ts;
+            CREATE INDEX IF NOT EXISTS idx_events_user_concept_ts_weight
+              ON events (user_id, concept, ts, weight);
+
             CREATE TABLE IF NOT EXISTS concepts (
               concept   TEXT PRIMARY KEY,
               canonical TEXT,
-              embedding BLOB           
+              embedding BLOB,          -- legacy, migrated to VEC_PATH
+              vec_row   INTEGER        -- record number in VEC_PATH
+            );
+            CREATE TABLE IF NOT EXISTS cache (
+              key       TEXT PRIMARY KEY,      -- sha256 of the request
+              value     TEXT
             );
             """
         )
+        cols = {r[1] for r in cx.execute("PRAGMA table_info(concepts)")}
+        if "vec_row" not in cols:
+            cx.execute("ALTER TABLE concepts ADD COLUMN vec_row INTEGER")
 
 _init_schema()
 
 # ------------------------------------------------------------------ #
 # 2 .  Helpers: embeddings & FAISS                                   #
 # ------------------------------------------------------------------ #
+EMBED_CACHE_MAX = 4096
+_EMBED_CACHE: "OrderedDict[str, np.ndarray]" = OrderedDict()   # text → vector, LRU
+_EMBED_LOCK = threading.Lock()
+
+def _cached_vec(text: str) -> Optional[np.ndarray]:
+    with _EMBED_LOCK:
+        vec = _EMBED_CACHE.get(text)
+        if vec is not None:
+            _EMBED_CACHE.move_to_end(text)
+        return vec
+
+def _cache_vec(text: str, vec: np.ndarray) -> None:
+    vec.setflags(write=False)              # shared by every caller
+    with _EMBED_LOCK:
+        _EMBED_CACHE[text] = vec
+        _EMBED_CACHE.move_to_end(text)
+        while len(_EMBED_CACHE) > EMBED_CACHE_MAX:
+            _EMBED_CACHE.popitem(last=False)
+
+def _embed_one(text: str) -> np.ndarray:
+    """Cached single-phrase encode; the returned array is read-only."""
+    vec = _cached_vec(text)
+    if vec is None:
+        vec = EMBEDDER.encode(text, normalize_embeddings=True).astype(np.float32)
+        _cache_vec(text, vec)
+    return vec
+
 def _embed(text: str) -> np.ndarray:
     """Return a **normalised** 384-float32 vector."""
-    vec = EMBEDDER.encode(text, normalize_embeddings=True)
-    return vec.astype(np.float32)
+    return _embed_one(text)
+
+def _embed_batch(texts: List[str], batch_size: int = 32) -> np.ndarray:
+    """Encode many phrases; row *i* belongs to ``texts[i]``.
 
-def _bytes_to_vec(b: bytes) -> np.ndarray:
-    return np.frombuffer(b, dtype=np.float32)
+    Phrases already in the encode cache are not re-encoded; the misses go
+    through one call, sorted by length so each mini-batch pads as little
+    as possible, and are cached for next time.
+    """
+    vecs = {t: v for t in texts if (v := _cached_vec(t)) is not None}
+    misses = sorted({t for t in texts if t not in vecs}, key=len)
+    if misses:
+        new = np.asarray(EMBEDDER.encode(              # no copy if already f32
+            misses,
+            batch_size=batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+        ), dtype=np.float32)
+        for text, vec in zip(misses, new):
+            vec = vec.copy()                   # own row, not a view of *new*
+            _cache_vec(text, vec)
+            vecs[text] = vec
+    out = np.empty((len(texts), EMBED_DIM), dtype=np.float32)
+    for i, text in enumerate(texts):
+        out[i] = vecs[text]
+    return out
+
+def _quantise(vecs: np.ndarray) -> np.ndarray:
+    """Rows of *vecs* → ``_VEC_DTYPE`` records (int8 codes + per-row scale)."""
+    scale = np.abs(vecs).max(axis=1) / np.float32(127.0)
+    scale[scale == 0] = 1.0
+    recs = np.empty(len(vecs), dtype=_VEC_DTYPE)
+    recs["scale"] = scale
+    recs["q"] = np.round(vecs / scale[:, None])
+    return recs
+
+def _dequantise(recs: np.ndarray) -> np.ndarray:
+    return recs["q"].astype(np.float32) * recs["scale"][:, None]
+
+def _append_vecs(recs: np.ndarray) -> int:
+    """Append *recs* to ``VEC_PATH``; return the record number of the first.
+
+    Callers hold the write transaction, which serialises appends.  A torn
+    tail from a crashed write is skipped, never reused.
+    """
+    size = _VEC_DTYPE.itemsize
+    with open(VEC_PATH, "ab") as f:
+        end = f.tell()
+        first = -(-end // size)
+        f.write(b"\0" * (first * size - end))
+        f.write(recs.tobytes())
+    return first
+
+def _open_vecs() -> np.ndarray:
+    """Read-only memmap over every record in ``VEC_PATH``."""
+    n = VEC_PATH.stat().st_size // _VEC_DTYPE.itemsize
+    return np.memmap(VEC_PATH, dtype=_VEC_DTYPE, mode="r", shape=(n,))
+
+def _migrate_blobs() -> None:
+    """One-off: move embeddings still stored as BLOBs into ``VEC_PATH``."""
+    with _tx() as cx:
+        rows = cx.execute("SELECT rowid, embedding FROM concepts "
+                          "WHERE vec_row IS NULL AND embedding IS NOT NULL "
+                          "ORDER BY rowid").fetchall()
+        if not rows:
+            return
+        # one join + one cast per BLOB layout instead of an array per row
+        size = _VEC_DTYPE.itemsize
+        packed = np.array([len(b) == size for _, b in rows])
+        recs = np.empty(len(rows), dtype=_VEC_DTYPE)
+        if packed.any():
+            raw = b"".join(b for _, b in rows if len(b) == size)
+            recs[packed] = np.frombuffer(raw, dtype=_VEC_DTYPE)
+        if not packed.all():                # legacy raw float32 BLOBs
+            raw = b"".join(b for _, b in rows if len(b) != size)
+            recs[~packed] = _quantise(
+                np.frombuffer(raw, dtype=np.float32).reshape(-1, EMBED_DIM))
+        first = _append_vecs(recs)
+        cx.executemany("UPDATE concepts SET vec_row = ?, embedding = NULL "
+                       "WHERE rowid = ?",
+                       [(first + i, rid) for i, (rid, _) in enumerate(rows)])
+    logger.info("migrated %d embeddings to %s", len(rows), VEC_PATH.name)
+
+_migrate_blobs()
+
+def _new_index(vecs: np.ndarray) -> faiss.Index:
+    """Return an empty (but trained) inner-product index sized for *vecs*.
+
+    Small stores get HNSW over fp16 codes (half the RAM of float32); past
+    ``IVF_MIN_ROWS`` an IVF-PQ index keeps memory ~16× lower and search
+    sub-linear; a learned OPQ rotation in front of it recovers most of the
+    recall PQ loses at the same 16-byte code.  Inner product on normed
+    vectors == cosine.
+    """
+    if len(vecs) > IVF_MIN_ROWS:
+        index = faiss.index_factory(EMBED_DIM, "OPQ16_64,IVF64,PQ16x8",
+                                    faiss.METRIC_INNER_PRODUCT)
+
+        index.train(vecs)
+        faiss.extract_index_ivf(index).nprobe = IVF_NPROBE
+    else:
+        index = faiss.IndexHNSWSQ(EMBED_DIM, faiss.ScalarQuantizer.QT_fp16,
+                                  32, faiss.METRIC_INNER_PRODUCT)
+        index.train(vecs)                  # no-op for fp16, sets is_trained
+    return index
+
+def _write_atomic(path: pathlib.Path, data: bytes) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    tmp.replace(path)
+
+def save_index() -> None:
+    """Write the live index and its row → concept list if they changed.
+
+    Called from the background saver and at exit, never from ingest. The
+    index is serialised to memory under the read lock, so adds only wait
+    for that copy, and written to disk outside it. Rows follow add order,
+    which concurrent inserts can make differ from rowid order, so the
+    concept list is saved alongside the index.
+    """
+    global _UNSAVED_ADDS
+    with _SAVE_LOCK:
+        with FAISS_LOCK.read():
+            if FAISS_INDEX is None or not _UNSAVED_ADDS:
+                return
+            _UNSAVED_ADDS = 0
+            data = faiss.serialize_index(FAISS_INDEX)
+            rows = json.dumps(FAISS_INDEX.concepts)
+        _write_atomic(INDEX_PATH, data.tobytes())
+        _write_atomic(ROWS_PATH, rows.encode())
+
+def _saver() -> None:
+    while True:
+        time.sleep(SAVE_EVERY_SECS)
+        try:
+            save_index()
+        except Exception as e:
+            logger.warning("saving the FAISS index failed: %s", e)
 
 def _rebuild_faiss() -> None:
-    """Reload all embeddings from DB into a single in-memory index."""
-    global FAISS_INDEX
+    """Reload all embeddings from the vector file into a single index."""
+    global FAISS_INDEX, _PENDING_ADDS, _UNSAVED_ADDS
+    _PENDING_ADDS = 0
     with _conn() as cx:
-        rows = cx.execute("SELECT concept, embedding FROM concepts "
-                          "WHERE embedding IS NOT NULL").fetchall()
+        rows = cx.execute("SELECT concept, vec_row FROM concepts "
+                          "WHERE vec_row IS NOT NULL ORDER BY rowid").fetchall()
     if not rows:
         FAISS_INDEX = None
+        INDEX_PATH.unlink(missing_ok=True)
+        ROWS_PATH.unlink(missing_ok=True)
         return
 
-    vecs = np.vstack([_bytes_to_vec(b) for _, b in rows])
-    index = faiss.IndexFlatIP(EMBED_DIM)      # dot-product on normed vecs == cosine
+    vecs = _dequantise(_open_vecs()[[r for _, r in rows]])   # one gather
+    index = _new_index(vecs)
     index.add(vecs)
     index.concepts = [c for c, _ in rows]     # store list for lookup
     FAISS_INDEX = index
+    _UNSAVED_ADDS = len(rows)                 # whole index is new
 
-def _upsert_concept(concept: str) -> None:
-    """Ensure concept exists with embedding; rebuild FAISS if new."""
+def _load_faiss() -> None:
+    """Reuse the saved index, topped up with concepts added since; else rebuild."""
+    global FAISS_INDEX
+    if INDEX_PATH.exists() and ROWS_PATH.exists():
+        with _conn() as cx:
+            rows = cx.execute("SELECT concept, vec_row FROM concepts "
+                              "WHERE vec_row IS NOT NULL ORDER BY rowid").fetchall()
+        index = faiss.read_index(str(INDEX_PATH))
+        saved = json.loads(ROWS_PATH.read_text())
+        have = set(saved)
+        missing = [(c, r) for c, r in rows if c not in have]
+        if index.ntotal == len(saved) and len(saved) + len(missing) == len(rows):
+            index.concepts = saved
+            FAISS_INDEX = index
+            if missing:                    # added after the last save
+                _index_add([c for c, _ in missing],
+                           _dequantise(_open_vecs()[[r for _, r in missing]]))
+            return
+        logger.info("stale FAISS index (%d vs %d concepts) → rebuild",
+                    index.ntotal, len(rows))
+    _rebuild_faiss()
+
+def _index_add(concepts: List[str], vecs: np.ndarray) -> None:
+    """Append rows of *vecs* to the live index (caller holds the write lock).
+
+    Trained IVF centroids and the HNSW/IVF choice drift as the store grows,
+    so every ``REBUILD_EVERY`` adds we rebuild from the DB instead.
+    """
+    global _PENDING_ADDS, _UNSAVED_ADDS
+    if (FAISS_INDEX is None or not FAISS_INDEX.is_trained
+            or _PENDING_ADDS >= REBUILD_EVERY):
+        _rebuild_faiss()
+        return
+    FAISS_INDEX.add(vecs)
+    FAISS_INDEX.concepts.extend(concepts)
+    _PENDING_ADDS += len(concepts)
+    _UNSAVED_ADDS += len(concepts)         # picked up by save_index()
+
+def _upsert_concepts(concepts: List[str]) -> None:
+    """Ensure every concept exists with embedding; add new ones to FAISS."""
+    concepts = list(dict.fromkeys(concepts))          # dedupe, keep order
     with _conn() as cx:
-        row = cx.execute("SELECT embedding FROM concepts WHERE concept=?",
-                         (concept,)).fetchone()
-        if row:
-            return                         # already known
+        known = {c for (c,) in cx.execute(
+            "SELECT concept FROM concepts WHERE concept IN (%s)"
+            % ",".join("?" * len(concepts)), concepts)}
+    new = [c for c in concepts if c not in known]
+    if not new:
+        return                             # all already known
+
+    # embed outside the write lock
+    vecs = _embed(new[0])[None, :] if len(new) == 1 else _embed_batch(new)
+    inserted = []                          # row numbers into new / vecs
+    with _tx() as cx:
+        for i, concept in enumerate(new):
+            cur = cx.execute("INSERT OR IGNORE INTO concepts "
+                             "(concept, canonical) VALUES (?,?)",
+                             (concept, concept))
+            if cur.rowcount:               # else another thread won the race
+                inserted.append(i)
+        if inserted:
+            first = _append_vecs(_quantise(vecs[inserted]))
+            cx.executemany("UPDATE concepts SET vec_row = ? WHERE concept = ?",
+                           [(first + j, new[i]) for j, i in enumerate(inserted)])
+    if not inserted:
+        return
+
+    with FAISS_LOCK.write():
+        _index_add([new[i] for i in inserted], vecs[inserted])
 
-        vec = _embed(concept)
-        cx.execute("INSERT INTO concepts (concept, canonical, embedding) "
-                   "VALUES (?,?,?)",
-                   (concept, concept, vec.tobytes()))
+def _upsert_concept(concept: str) -> None:
+    """Ensure concept exists with embedding; add it to FAISS if new."""
+    _upsert_concepts([concept])
 
-    with FAISS_LOCK:
-        _rebuild_faiss()                  # refresh index
+with FAISS_LOCK.write():
+    _load_faiss()
+threading.Thread(target=_saver, name="faiss-saver", daemon=True).start()
+atexit.register(save_index)                # else a restart would retrain
 
 # ------------------------------------------------------------------ #
 # 3 .  Public API                                                    #
@@ -109,26 +457,63 @@ def add_event(
     event_type: str,
     weight: float | None = None,
     ts: int | None = None,
+    *,
+    canonical: bool = False,
 ) -> None:
-    """Log a learning signal and make sure the concept is embedded."""
+    """Log a learning signal and make sure the concept is embedded.
+
+    Pass ``canonical=True`` when *concept* is already lower-cased and
+    stripped (e.g. a key from :func:`classify`).
+    """
     if event_type not in _EVENT_WEIGHTS and weight is None:
         raise ValueError(f"Unknown event_type={event_type!r}")
 
     w  = _EVENT_WEIGHTS.get(event_type) if weight is None else weight
     ts = ts or int(time.time())
-    concept = concept.lower().strip()
+    if not canonical:
+        concept = concept.lower().strip()
 
     _upsert_concept(concept)
 
-    print(f"Adding event: {user_id}, {concept}, {w}, {ts}")
+    logger.debug("Adding event: %s, %s, %s, %s", user_id, concept, w, ts)
 
-    with _conn() as cx:
+    with _tx() as cx:
         cx.execute(
             "INSERT INTO events (user_id, concept, weight, ts) "
             "VALUES (?,?,?,?)",
             (user_id, concept, w, ts),
         )
 
+def add_events(
+    user_id: str,
+    events: List[Tuple[str, str]],
+    ts: int | None = None,
+) -> None:
+    """Bulk :func:`add_event` for ``(concept, event_type)`` pairs.
+
+    New concepts are embedded in one batch and all rows are written in a
+    single transaction.
+    """
+    ts = ts or int(time.time())
+    rows = []
+    for concept, event_type in events:
+        if event_type not in _EVENT_WEIGHTS:
+            raise ValueError(f"Unknown event_type={event_type!r}")
+        rows.append((user_id, concept.lower().strip(),
+                     _EVENT_WEIGHTS[event_type], ts))
+    if not rows:
+        return
+
+    _upsert_concepts([r[1] for r in rows])
+
+    with _tx() as cx:
+        cx.executemany(
+            "INSERT INTO events (user_id, concept, weight, ts) "
+            "VALUES (?,?,?,?)",
+            rows,
+        )
+
+
 def mastery_scores(
     user_id: str,
     half_life_days: float = 30.0,
@@ -139,58 +524,111 @@ def mastery_scores(
 
     with _conn() as cx:
         rows = cx.execute(
-            "SELECT concept, SUM(weight * EXP(-? * (? - ts))) "
-            "FROM events WHERE user_id=? GROUP BY concept",
-            (decay_lambda, now, user_id),
+            "SELECT concept, weight, ts FROM events WHERE user_id=?",
+            (user_id,),
         ).fetchall()
+    if not rows:
+        return {}
 
-    def squash(x: float) -> float:          # logistic
-        return 1 / (1 + pow(2.71828, -x))
+    # decay + per-concept sum in NumPy instead of a per-row EXP() in SQLite
+    concepts, weights, ts = zip(*rows)
+    vals = np.asarray(weights, dtype=np.float64) * np.exp(
+        -decay_lambda * (now - np.asarray(ts, dtype=np.float64)))
+    names, inv = np.unique(np.asarray(concepts), return_inverse=True)
+    totals = np.bincount(inv, weights=vals, minlength=len(names))
+    squashed = 1.0 / (1.0 + np.exp(-totals))        # logistic, exact e
+
+    return dict(zip(names.tolist(), squashed.tolist()))
+
+def profile(
+    user_id: str,
+    weak_thresh: float = 0.4,
+    strong_thresh: float = 0.7,
+    limit: int = 20,
+) -> Tuple[List[str], List[str]]:
+    """Known (weak, strong) concepts for *user_id*, most extreme first."""
+    ranked = sorted(mastery_scores(user_id).items(), key=lambda kv: kv[1])
+    weak = [c for c, s in ranked if s < weak_thresh][:limit]
+    strong = [c for c, s in reversed(ranked) if s > strong_thresh][:limit]
+    return weak, strong
 
-    return {c: squash(v) for c, v in rows}
 
 # ------------------------------------------------------------------ #
 # 4 .  Nearest-neighbour fallback                                   #
 # ------------------------------------------------------------------ #
-def _nearest_score(
-    phrase: str,
+def _blend(
+    sims: np.ndarray,
+    neighbour_scores: np.ndarray,
+    hit: np.ndarray,
+    default: float = 0.0,
+) -> np.ndarray:
+    """Shrink each neighbour's score toward *default* by (1 - sim).
+
+    Branchless over the whole batch; rows outside *hit* become ``NaN``.
+    """
+    return np.where(hit, sims * neighbour_scores + (1.0 - sims) * default,
+                    np.nan)
+
+def _nearest_scores(
+    phrases: List[str],
     scores: Dict[str, float],
     *,
     sim_thresh: float = 0.25,
     log: bool = False,
-) -> Optional[float]:
-    """Return weighted mastery score of closest neighbour or **None**.
+) -> np.ndarray:
+    """Batched :func:`_nearest_score` – one encode and one FAISS search.
 
-    Returns ``None`` when
-      • there is no FAISS index yet, or
-      • the best cosine similarity is below *sim_thresh*.
+    Returns a float array aligned with *phrases*; ``NaN`` marks "no
+    neighbour close enough".
     """
+    out = np.full(len(phrases), np.nan)
+    if not phrases:
+        return out
 
     if FAISS_INDEX is None:
         if log:
-            logger.debug("%s → [no index]", phrase)
-        return None
-
-    vec = _embed(phrase)
-    with FAISS_LOCK:
-        D, I = FAISS_INDEX.search(vec[None, :], 1)
+            for phrase in phrases:
+                logger.debug("%s → [no index]", phrase)
+        return out
+
+    # FAISS copies any query that is not C-contiguous float32
+    q = np.ascontiguousarray(_embed_batch(phrases), dtype=np.float32)
+    with FAISS_LOCK.read():                # searches run concurrently
+        D, I = FAISS_INDEX.search(q, 1)
+        concepts = FAISS_INDEX.concepts
+
+    sims, idx = D[:, 0].astype(np.float64), I[:, 0]
+    hit = (sims >= sim_thresh) & (idx >= 0)
+    neighbour_scores = np.array(
+        [scores.get(concepts[j], 0.0) if ok else 0.0 for j, ok in zip(idx, hit)])
+    out = _blend(sims, neighbour_scores, hit)
 
-    sim = float(D[0][0])
-    idx = int(I[0][0])
-
-    if sim < sim_thresh or idx < 0:
-        if log:
-            logger.debug("%s → sim %.2f below threshold %.2f → None", phrase, sim, sim_thresh)
-        return None
+    if log:
+        for phrase, sim, j, ok, score in zip(phrases, sims, idx, hit, out):
+            if ok:
+                logger.debug("%s → neighbour %s (sim %.2f) => score %.2f",
+                             phrase, concepts[j], sim, score)
+            else:
+                logger.debug("%s → sim %.2f below threshold %.2f → None",
+                             phrase, sim, sim_thresh)
 
-    neighbour = FAISS_INDEX.concepts[idx]
-    neighbour_score = scores.get(neighbour, 0.0)
-    score = (neighbour_score * sim) + (0.0 * (1 - sim))
+    return out
 
-    if log:
-        logger.debug("%s → neighbour %s (sim %.2f) => score %.2f", phrase, neighbour, sim, score)
+def _nearest_score(
+    phrase: str,
+    scores: Dict[str, float],
+    *,
+    sim_thresh: float = 0.25,
+    log: bool = False,
+) -> Optional[float]:
+    """Return weighted mastery score of closest neighbour or **None**.
 
-    return score
+    Returns ``None`` when
+      • there is no FAISS index yet, or
+      • the best cosine similarity is below *sim_thresh*.
+    """
+    score = _nearest_scores([phrase], scores, sim_thresh=sim_thresh, log=log)[0]
+    return None if np.isnan(score) else float(score)
 
 # ------------------------------------------------------------------ #
 # 5 .  Classification helper                                        #
@@ -216,29 +654,78 @@ def classify(
         weak, strong, neutral = mastery.classify(user, phrases, debug=True)
     """
     scores = mastery_scores(user_id)
-    weak, strong, neutral = [], [], []
-
-    for p in phrases:
-        key = p.lower().strip()
-        s = scores.get(key)
-        if s is None:
-            # Try neighbour lookup
-            s = _nearest_score(key, scores, log=debug)
-
-        if s is None:
-            # Unknown concept – stays neutral
-            neutral.append(p)
-        elif s < weak_thresh:
-            weak.append(p)
-        elif s > strong_thresh:
-            strong.append(p)
-        else:
-            neutral.append(p)
-
-    return weak, strong, neutral
+
+    keys = [sys.intern(p.lower().strip()) for p in phrases]   # normalise once
+    known = np.array([scores.get(k, np.nan) for k in keys], dtype=np.float64)
+
+    # Neighbour lookup for every distinct unknown key in one batch
+    unknown = np.isnan(known)
+    if unknown.any():
+        todo = list(dict.fromkeys(k for k, u in zip(keys, unknown) if u))
+        found = dict(zip(todo, _nearest_scores(todo, scores, log=debug)))
+        known[unknown] = [found[k] for k, u in zip(keys, unknown) if u]
+
+    # NaN (still unknown) compares False both ways → neutral
+    is_weak = known < weak_thresh
+    is_strong = known > strong_thresh
+    is_neutral = ~(is_weak | is_strong)
+
+    def pick(mask: np.ndarray) -> List[str]:
+        return [phrases[i] for i in np.flatnonzero(mask)]
+
+    return pick(is_weak), pick(is_strong), pick(is_neutral)
+
+
+# ------------------------------------------------------------------ #
+# 6 .  LLM response cache                                           #
+# ------------------------------------------------------------------ #
+def cache_get(key: str) -> Optional[str]:
+    """Return the cached value for *key* or **None**."""
+    with _conn() as cx:
+        row = cx.execute("SELECT value FROM cache WHERE key=?", (key,)).fetchone()
+    return row[0] if row else None
+
+def cache_put(key: str, value: str) -> None:
+    with _tx() as cx:
+        cx.execute("INSERT OR REPLACE INTO cache (key, value) VALUES (?,?)",
+                   (key, value))
+
+# Semantic tier: near-duplicate texts (same paragraph, re-sent with small
+# edits) reuse a cached value.  In memory only, one exact index per scope.
+SEMANTIC_HIT_SIM = 0.97      # cosine above which two texts count as one
+SEMANTIC_SCOPES  = 8         # scopes (prompt variants) kept, LRU
+SEMANTIC_MAX     = 10_000    # texts per scope before it starts over
+_SEMANTIC: "OrderedDict[str, Tuple[faiss.IndexFlatIP, List[str]]]" = OrderedDict()
+_SEMANTIC_LOCK = threading.Lock()
+
+def semantic_get(scope: str, text: str) -> Optional[str]:
+    """Value cached for a near-duplicate of *text* within *scope*, or **None**."""
+    with _SEMANTIC_LOCK:
+        entry = _SEMANTIC.get(scope)
+        if entry is None:
+            return None
+        _SEMANTIC.move_to_end(scope)
+    vec = _embed(text)[None, :]            # encode outside the lock
+    with _SEMANTIC_LOCK:
+        D, I = entry[0].search(vec, 1)
+    if I[0, 0] < 0 or D[0, 0] < SEMANTIC_HIT_SIM:
+        return None
+    return entry[1][I[0, 0]]
+
+def semantic_put(scope: str, text: str, value: str) -> None:
+    vec = _embed(text)[None, :]
+    with _SEMANTIC_LOCK:
+        entry = _SEMANTIC.get(scope)
+        if entry is None or entry[0].ntotal >= SEMANTIC_MAX:
+            entry = _SEMANTIC[scope] = (faiss.IndexFlatIP(EMBED_DIM), [])
+        _SEMANTIC.move_to_end(scope)
+        while len(_SEMANTIC) > SEMANTIC_SCOPES:
+            _SEMANTIC.popitem(last=False)
+        entry[0].add(vec)
+        entry[1].append(value)
 
 # ------------------------------------------------------------------ #
-# 6 .  Demo                                                         #
+# 7 .  Demo                                                         #
 # ------------------------------------------------------------------ #
 if __name__ == "__main__":
     USER = "alice"
@@ -1,48 +1,71 @@
 # server.py
 from __future__ import annotations
 from typing import Dict, Optional
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from openai import OpenAI, OpenAIError
-import os, json
-from fastapi.middleware.cors import CORSMiddleware
+from openai import AsyncOpenAI, OpenAIError
+import os, re, time, asyncio, hashlib, ssl, logging
+import httpx
+import orjson
 from dotenv import load_dotenv
 import weave
 
 load_dotenv()
+logger = logging.getLogger(__name__)
 
 # ─── internal mastery module (your previous file) ──────────────────────
 import mastery
 
 # ─── config ────────────────────────────────────────────────────────────
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# one TLS context and one keep-alive pool shared by every OpenAI request;
+# the pool and client live on app.state, made per app start in lifespan
+SHARED_SSL = ssl.create_default_context()
+HTTPX_LIMITS = httpx.Limits(max_connections=200, max_keepalive_connections=100)
+# httpx's pool degrades past ~50 concurrent requests; queue the rest here
+OPENAI_MAX_INFLIGHT = 48
+_OPENAI_SEM = asyncio.Semaphore(OPENAI_MAX_INFLIGHT)
 MODEL  = "gpt-4o-mini"
 USER   = "browser_user"                 # you may want a cookie / auth here
 
 # weave inference
 INFERENCE_ENDPOINT = "https://api.inference.wandb.ai/v1"
+WEAVE_ENABLED = os.getenv("WEAVE_ENABLED") == "1"   # tracing costs CPU per call
 
-<<<<<<< HEAD
-# weave inference
-INFERENCE_ENDPOINT = "https://api.inference.wandb.ai/v1"
+def weave_op():
+    """``weave.op()`` when tracing is on, else a no-op decorator."""
+    return weave.op() if WEAVE_ENABLED else (lambda f: f)
 
-=======
->>>>>>> f303912d054fa6bf14408e0fe331fe69498235fb
 # ─── FastAPI boilerplate ───────────────────────────────────────────────
-app = FastAPI(title="ReadWeaver-backend")
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Or restrict to your extension origin
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WEAVE_ENABLED:
+        weave.init('Lenz') # 🐝  once per process, not per import
+    global _EVENT_Q
+    app.state.httpx = httpx.AsyncClient(verify=SHARED_SSL, limits=HTTPX_LIMITS, timeout=60)
+    app.state.oai = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"),
+                                http_client=app.state.httpx)
+    _EVENT_Q = asyncio.Queue(maxsize=EVENT_QUEUE_MAX)   # bound to this loop
+    writer = asyncio.create_task(_event_writer())
+    yield
+    writer.cancel()
+    with suppress(asyncio.CancelledError):
+        await writer                    # let it write the batch it holds
+    await flush_events()
+    _EVENT_Q = None
+    await app.state.httpx.aclose()      # drop pooled keep-alive connections
+    if WEAVE_ENABLED:
+        weave.finish()                  # flush pending traces, don't drop them
+
+
+app = FastAPI(title="ReadWeaver-backend", lifespan=lifespan,
+              default_response_class=ORJSONResponse)
 
-# Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, replace with specific origins
+    allow_origins=["*"],  # Or restrict to your extension origin
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -86,6 +109,54 @@ class ClassifyResp(BaseModel):
     strong: list[str]
     neutral: list[str]
 
+# ─── batched mastery event writer ──────────────────────────────────────
+EVENT_FLUSH_SECS = 0.1                  # max delay before a batch is written
+EVENT_FLUSH_MAX  = 100                  # max events per transaction
+EVENT_QUEUE_MAX  = 10_000               # queued events before new ones are dropped
+_EVENT_Q: "Optional[asyncio.Queue[tuple[str, str]]]" = None   # created in lifespan
+
+def queue_event(concept: str, event_type: str) -> None:
+    """Hand an event to the background writer without touching SQLite."""
+    if _EVENT_Q is None:
+        raise RuntimeError("event writer is not running")
+    try:
+        _EVENT_Q.put_nowait((concept, event_type))
+    except asyncio.QueueFull:
+        logger.warning("Event queue full – dropped %s for: %s", event_type, concept)
+
+async def write_events(batch: list[tuple[str, str]]) -> None:
+    try:
+        await asyncio.to_thread(mastery.add_events, USER, batch)
+        invalidate_profile()
+    except Exception:
+        logger.exception("Failed to log %d events", len(batch))
+
+async def _event_writer() -> None:
+    """Flush queued events every ~100 ms or 100 items, one transaction each."""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await _EVENT_Q.get()]
+        deadline = loop.time() + EVENT_FLUSH_SECS
+        try:
+            while len(batch) < EVENT_FLUSH_MAX:
+                try:
+                    batch.append(await asyncio.wait_for(_EVENT_Q.get(),
+                                                        deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    break
+        except asyncio.CancelledError:
+            await write_events(batch)   # already dequeued, flush_events won't see it
+            raise
+        await write_events(batch)
+
+async def flush_events() -> None:
+    """Write whatever is still queued (shutdown)."""
+    batch = []
+    while not _EVENT_Q.empty():
+        batch.append(_EVENT_Q.get_nowait())
+    if batch:
+        await write_events(batch)
+
 # ─── OpenAI tool schemas ───────────────────────────────────────────────
 EXTRACT_TOOL = [
     {
@@ -112,7 +183,8 @@ REWRITE_TOOL = [
       "type": "function",
       "function": {
         "name": "rewrite_batch",
-        "description": "Rewrite each snippet given the user's weak/strong topics",
+        "description": "Return only the snippets rewritten for the user's "
+                       "weak/strong topics, by array index",
         "parameters": {
           "type": "object",
           "properties": {
@@ -134,30 +206,244 @@ REWRITE_TOOL = [
     }
 ]
 
+# one snippet per call, fanned out by rewrite_snips
+REWRITE_ONE_TOOL = [
+    {
+      "type": "function",
+      "function": {
+        "name": "rewrite_one",
+        "description": "Rewrite one snippet given the user's weak/strong topics",
+        "parameters": {
+          "type": "object",
+          "properties": {
+            "text": {"type": "string"}
+          },
+          "required": ["text"]
+        }
+      }
+    }
+]
+REWRITE_FANOUT     = 20                 # max parallel per-snippet calls per request
+PARALLEL_MIN_CHARS = 600                # below this one batched call is cheaper
+
+# summary concept + in-place rephrase for /rephrase
+REPHRASE_TOOL = [
+    {
+      "type": "function",
+      "function": {
+        "name": "rephrase_out",
+        "description": "Return the confusion concept and the rephrased passage",
+        "parameters": {
+          "type": "object",
+          "properties": {
+            "summary":  {"type": "string"},
+            "rephrase": {"type": "string"}
+          },
+          "required": ["summary", "rephrase"]
+        }
+      }
+    }
+]
+
+# extract + rewrite in one round trip (see /rewrite)
+ANALYZE_TOOL = [
+    {
+      "type": "function",
+      "function": {
+        "name": "analyze_and_rewrite",
+        "description": "Return key phrases that may need mastery lookup "
+                       "and the snippets rewritten for the user",
+        "parameters": {
+          "type": "object",
+          "properties": {
+            "phrases":  EXTRACT_TOOL[0]["function"]["parameters"]["properties"]["phrases"],
+            "rewrites": REWRITE_TOOL[0]["function"]["parameters"]["properties"]["rewrites"],
+          },
+          "required": ["phrases", "rewrites"]
+        }
+      }
+    }
+]
+
+EXTRACT_CHOICE     = {"type": "function", "function": {"name": "list_phrases"}}
+REWRITE_CHOICE     = {"type": "function", "function": {"name": "rewrite_batch"}}
+REWRITE_ONE_CHOICE = {"type": "function", "function": {"name": "rewrite_one"}}
+ANALYZE_CHOICE     = {"type": "function", "function": {"name": "analyze_and_rewrite"}}
+REPHRASE_CHOICE    = {"type": "function", "function": {"name": "rephrase_out"}}
+
+# ─── system prompts (built once, filled per request) ──────────────────
+EXTRACT_PROMPT = "Extract key technical phrases the reader might not know."
+REWRITE_PROMPT_TMPL = (
+    "You are ReadWeaver. The user finds these topics hard: "
+    "{weak}. They are comfortable with: {strong}. "
+    "Err on the side of leaving text as it is. Only rewrite when a sentence *directly* involves a hard topic. "
+    "If none of the topics provided are relevant to a snippet, return it exactly as given. "
+    "When rewriting, operate at the **sentence level**: leave untouched sentences verbatim and only change the sentences that need clarification. "
+    "For any sentence you change, wrap JUST THAT sentence (not the whole paragraph) in <span style='color:#8B4513'>…</span> so the UI highlights only the modified parts. Unmodified sentences must stay outside any span. "
+    "Maintain the original HTML structure and tags. Do not rewrite titles or headers. "
+    "Jargon → add intuitive explanation in brackets; include an example if helpful. Keep language approx. 9th-grade. "
+    "If no information about user mastery is provided, or nothing is relevant, do not rewrite. "
+    "Return via {tool}."
+)
+REWRITE_ONE_SUFFIX = (" If nothing needs changing, return an empty `text`"
+                      " instead of repeating the snippet.")
+ARRAY_SUFFIX = (" Snippets arrive as a JSON array of strings and `id` is the array index."
+                " Return only the snippets you actually changed; omit the rest.")
+ANALYZE_SUFFIX = " Also list the key technical phrases the reader might not know in `phrases`."
+REPHRASE_PROMPT = (
+    "You are a helpful assistant. For the given context and selected passage, produce: \n"
+    "1. summary – a SHORT concept name or key phrase (max 5 words) capturing the essence of the user's confusion/question, based on BOTH the selected text and its replacement. Don't use fillers like Understanding. The purpose is to create a vector database of concepts so name it accordingly\n"
+    "2. rephrase – if possible, prefer to keep the original text and simply add a brief explanation in brackets after any jargon or unclear term. Only fully rephrase the text if this would make it much clearer than just adding brackets. Ensure the result still fits grammatically in the original context.\n\n"
+    "Return via rephrase_out."
+)
+
+# ─── local pre-filter: skip the LLM for trivially small pages ──────────
+MIN_CONTENT_WORDS = 3                   # fewer uncommon words → nothing to extract
+_WORD_RE = re.compile(r"\w+")           # Unicode-aware: pages are not ASCII
+COMMON_WORDS = frozenset("""
+a about above after again all also am an and any are as at be because been
+before being below between both but by can could did do does doing down
+during each few for from further get got had has have having he her here
+hers him his how i if in into is it its just like me more most my no nor
+not now of off on once only or other our out over own please same she
+should so some such than thank thanks that the their them then there these
+they this those through to too under until up very was we were what when
+where which while who whom why will with would yes yet you your
+hi hello hey ok okay welcome home menu search login sign share next back
+""".split())
+
+PROFILE_TTL_SECS = 30.0                 # how long a cached mastery profile is reused
+# Longer texts skip the near-duplicate tier: the embedder only sees the first
+# 512 tokens, so pages sharing a header would look identical.
+SEMANTIC_MAX_CHARS = 400
+_profile_cache: tuple[float, list[str], list[str]] | None = None
+
 # ─── helpers ───────────────────────────────────────────────────────────
-@weave.op()
-def openai_call(messages, tools, tool_choice="auto"):
-    return client.chat.completions.create(
-        model=MODEL,
-        messages=messages,
-        tools=tools,
-        tool_choice=tool_choice,
-        temperature=0.2
-    )
+def tool_request(messages, tools, tool_choice="auto") -> dict:
+    """Chat-completions body for a tool call (live and Batch API alike)."""
+    return {
+        "model": MODEL,
+        "messages": messages,
+        "tools": tools,
+        "tool_choice": tool_choice,
+        "temperature": 0.2,
+    }
+
+@weave_op()
+async def openai_call(messages, tools, tool_choice="auto"):
+    async with _OPENAI_SEM:
+        return await app.state.oai.chat.completions.create(
+            **tool_request(messages, tools, tool_choice))
+
+_INFLIGHT: dict[str, asyncio.Future] = {}   # cache key → live call being awaited
+
+class _LeaderCancelled(Exception):
+    """The call a follower was waiting on was cancelled; it should retry."""
+
+def cache_key(messages, tools, tool_choice) -> str:
+    """sha256 of the whole canonicalised request, so snippets, weak/strong
+    topics and the prompt all take part."""
+    payload = orjson.dumps([MODEL, messages, tools, tool_choice],
+                           option=orjson.OPT_SORT_KEYS)
+    return hashlib.sha256(payload).hexdigest()
+
+async def tool_args(messages, tools, tool_choice, *, near: str | None = None) -> dict:
+    """Arguments of the forced tool call, answered from the cache when possible.
 
-def extract_phrases(snips: Dict[int, str]) -> list[str]:
-    numbered = "\n".join(f"{i}. {t}" for i, t in snips.items())
-    resp = openai_call(
+    With *near* (the user text), an exact miss next tries the result of a
+    near-duplicate text sent with the same system prompt and tools. Only for
+    answers a neighbour can share (extracted phrases), never for rewrites, and
+    only while *near* is under SEMANTIC_MAX_CHARS.
+    """
+    key = cache_key(messages, tools, tool_choice)
+    args = await asyncio.to_thread(mastery.cache_get, key)
+    if args is not None:
+        return orjson.loads(args)
+
+    while (pending := _INFLIGHT.get(key)) is not None:
+        try:                            # same request already on the wire
+            return orjson.loads(await asyncio.shield(pending))
+        except _LeaderCancelled:
+            continue                    # its caller went away; take over
+
+    _INFLIGHT[key] = pending = asyncio.get_running_loop().create_future()
+    try:
+        args = await fetch_args(key, messages, tools, tool_choice, near)
+    except asyncio.CancelledError:
+        pending.set_exception(_LeaderCancelled())
+        pending.exception()
+        raise
+    except Exception as e:
+        pending.set_exception(e)
+        pending.exception()             # followers re-raise; don't log it twice
+        raise
+    else:
+        pending.set_result(args)
+    finally:
+        del _INFLIGHT[key]
+    return orjson.loads(args)
+
+async def fetch_args(key, messages, tools, tool_choice, near) -> str:
+    """Semantic tier, then the live call; stores the result for next time."""
+    scope = None
+    if near is not None and len(near) <= SEMANTIC_MAX_CHARS:
+        scope = cache_key(messages[:1], tools, tool_choice)
+        args = await asyncio.to_thread(mastery.semantic_get, scope, near)
+        if args is not None:
+            return args                 # a neighbour's answer: not cached under *key*
+    resp = await openai_call(messages, tools=tools, tool_choice=tool_choice)
+    args = resp.choices[0].message.tool_calls[0].function.arguments
+    if scope is not None:
+        await asyncio.to_thread(mastery.semantic_put, scope, near, args)
+    await asyncio.to_thread(mastery.cache_put, key, args)
+    return args
+
+def worth_extracting(snips: Dict[int, str]) -> bool:
+    """True once the page has MIN_CONTENT_WORDS words outside COMMON_WORDS."""
+    words = _WORD_RE.findall(" ".join(snips.values()))
+
+    return sum(w.lower() not in COMMON_WORDS for w in words) >= MIN_CONTENT_WORDS
+
+def worth_rewriting(snips: Dict[int, str]) -> bool:
+    """Enough text, and at least one stored concept it could match."""
+    return worth_extracting(snips) and mastery.FAISS_INDEX is not None
+
+async def classify_phrases(phrases: list[str]) -> tuple[list[str], list[str]]:
+    """The weak / strong concepts among *phrases*; both empty when the page
+    doesn't touch the user's mastery."""
+    # FAISS + SQLite – keep it off the event loop
+    weak, strong, _ = await asyncio.to_thread(mastery.classify, USER, phrases)
+    return weak, strong
+
+async def extract_phrases(snips: Dict[int, str]) -> list[str]:
+    if not worth_extracting(snips):
+        return []                       # e.g. {0: "Hi!"} – skip the LLM
+    page = snippet_array(snips)
+    data = await tool_args(
         [
-            {"role": "system",
-             "content": "Extract key technical phrases the reader might not know."},
-            {"role": "user", "content": numbered}
+            {"role": "system", "content": EXTRACT_PROMPT},
+            {"role": "user", "content": page}
         ],
         tools=EXTRACT_TOOL,
-        tool_choice={"type": "function", "function": {"name": "list_phrases"}}
+        tool_choice=EXTRACT_CHOICE,
+        near=page,                      # only short pages, see SEMANTIC_MAX_CHARS
     )
-    args = resp.choices[0].message.tool_calls[0].function.arguments
-    return json.loads(args)["phrases"]
+    return data["phrases"]
+
+async def mastery_profile() -> tuple[list[str], list[str]]:
+    """The user's known weak / strong concepts, cached for PROFILE_TTL_SECS."""
+    global _profile_cache
+    now = time.monotonic()
+    if _profile_cache is None or _profile_cache[0] < now:
+        weak, strong = await asyncio.to_thread(mastery.profile, USER)
+        _profile_cache = (now + PROFILE_TTL_SECS, weak, strong)
+    return _profile_cache[1], _profile_cache[2]
+
+def invalidate_profile() -> None:
+    """Drop the cached profile after new mastery events were written."""
+    global _profile_cache
+    _profile_cache = None
+
 
 # ------------------------------------------------------------------
 #  Helper – rewrite snippets OR skip when nothing is relevant
@@ -166,7 +452,7 @@ def extract_phrases(snips: Dict[int, str]) -> list[str]:
 from typing import Optional, Dict as _Dict  # local alias to avoid confusion
 
 
-def rewrite_snips(
+async def rewrite_snips(
     snips: Dict[int, str],
     weak: list[str],
     strong: list[str],
@@ -183,129 +469,265 @@ def rewrite_snips(
         print("rewrite_snips: no mastery context → returning None")
         return None
 
-    numbered = "\n".join(f"{i}. {t}" for i, t in snips.items())
-    print(f"weak: {weak}")
-    print(f"strong: {strong}")
-    
-    system_prompt = (
-        "You are ReadWeaver. The user finds these topics hard: "
-<<<<<<< HEAD
-        "You are ReadWeaver. The user finds these topics hard: "
-        f"{weak}. They are comfortable with: {strong}. "
-        "Err on the side of leaving text as it is. Only rewrite when a sentence *directly* involves a hard topic. "
-        "If none of the topics provided are relevant to a snippet, return it exactly as given. "
-        "When rewriting, operate at the **sentence level**: leave untouched sentences verbatim and only change the sentences that need clarification. "
-        "For any sentence you change, wrap JUST THAT sentence (not the whole paragraph) in <span style='color:#8B4513'>…</span> so the UI highlights only the modified parts. Unmodified sentences must stay outside any span. "
-        "Maintain the original HTML structure and tags. Do not rewrite titles or headers. "
-        "Jargon → add intuitive explanation in brackets; include an example if helpful. Keep language approx. 9th-grade. "
-        "If no information about user mastery is provided, or nothing is relevant, do not rewrite. "
-        "Return via rewrite_batch."
-=======
-        f"{weak}. They are comfortable with: {strong}. "
-        "Rewrite each snippet so that it is understandable to an undergraduate student and leave it be if it is already understandable"
-        # "Rewrite each snippet accordingly; short, grade-8 language for weak topics, "
-        # "normal technical wording for strong.\nReturn via rewrite_batch."
->>>>>>> f303912d054fa6bf14408e0fe331fe69498235fb
-    )
-    # --- LLM call ---------------------------------------------------------------
-    resp = openai_call(
+    # --- LLM call(s) ------------------------------------------------------------
+    if len(snips) > 1 and sum(map(len, snips.values())) >= PARALLEL_MIN_CHARS:
+        # one small request per snippet: latency of the longest, not the sum,
+        # and each snippet is cached on its own
+        changed = {i: t async for i, t in rewrite_each(snips, weak, strong)}
+        return merge_rewrites(changed, snips)
+
+    data = await tool_args(
         [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": numbered}
+            {"role": "system", "content": rewrite_prompt(weak, strong) + ARRAY_SUFFIX},
+            {"role": "user", "content": snippet_array(snips)}
         ],
         tools=REWRITE_TOOL,
-        tool_choice={"type": "function", "function": {"name": "rewrite_batch"}}
+        tool_choice=REWRITE_CHOICE
+    )
+    return parse_rewrites(data, snips)
+
+async def rewrite_each(snips: Dict[int, str], weak: list[str], strong: list[str]):
+    """Yield ``(id, text)`` for every snippet as its rewrite_one call finishes."""
+    sem = asyncio.Semaphore(REWRITE_FANOUT)
+
+    async def one(i: int, text: str) -> tuple[int, str]:
+        async with sem:
+            return i, await rewrite_one(text, weak, strong)
+
+    tasks = [asyncio.create_task(one(i, t)) for i, t in snips.items()]
+    try:
+        for done in asyncio.as_completed(tasks):
+            yield await done
+    finally:                            # client gone or a call failed
+        for task in tasks:
+            task.cancel()
+
+async def rewrite_one(text: str, weak: list[str], strong: list[str]) -> str:
+    """Rewrite a single snippet; an unchanged snippet comes back as-is."""
+    data = await tool_args(
+        [
+            {"role": "system",
+             "content": rewrite_prompt(weak, strong, tool="rewrite_one")
+                        + REWRITE_ONE_SUFFIX},
+            {"role": "user", "content": text}
+        ],
+        tools=REWRITE_ONE_TOOL,
+        tool_choice=REWRITE_ONE_CHOICE,
     )
-    data = json.loads(resp.choices[0].message.tool_calls[0]
-                      .function.arguments)
-    rewritten_map = {item["id"]: item["text"] for item in data["rewrites"]}
+    return data["text"] or text
+
+def rewrite_prompt(weak: list[str], strong: list[str],
+                   tool: str = "rewrite_batch") -> str:
+    return REWRITE_PROMPT_TMPL.format_map({"weak": weak, "strong": strong, "tool": tool})
+
+def snippet_array(snips: Dict[int, str]) -> str:
+    """Snippets as a compact JSON array; the model refers to them by index."""
+    return orjson.dumps(list(snips.values())).decode()
+
+def parse_rewrites(data: dict, snips: Dict[int, str]) -> Optional[_Dict[int, str]]:
+    """Map a rewrite tool payload (ids index :func:`snippet_array`) onto *snips*."""
+    keys = list(snips)
+    changed = {keys[item["id"]]: item["text"] for item in data["rewrites"]
+               if 0 <= item["id"] < len(keys)}
+    return merge_rewrites(changed, snips)
+
+def merge_rewrites(changed: Dict[int, str], snips: Dict[int, str]) -> Optional[_Dict[int, str]]:
+    """Originals overlaid with *changed*, or **None** if nothing changed."""
+    changed = {k: t for k, t in changed.items() if t != snips.get(k)}
 
     # If nothing was rewritten (empty or identical) → treat as None
-    if not rewritten_map:
-        print("rewrite_snips: LLM returned empty rewrites → None")
+    if not changed:
+        print("rewrite_snips: no snippet changed → None")
         return None
 
-    no_change = all(rewritten_map.get(k) == snips.get(k) for k in rewritten_map)
-    if no_change:
-        print("rewrite_snips: rewrites identical to originals → None")
-        return None
+    return {**snips, **changed}
+
+async def analyze_and_rewrite(
+    snips: Dict[int, str],
+    weak: list[str],
+    strong: list[str],
+) -> tuple[list[str], Optional[_Dict[int, str]]]:
+    """One LLM call that both extracts phrases and rewrites *snips*.
+
+    The model is primed with the user's cached mastery profile instead of
+    waiting for the phrases of this page to be classified first.
+    """
+    data = await tool_args(analyze_messages(snips, weak, strong),
+                           tools=ANALYZE_TOOL, tool_choice=ANALYZE_CHOICE)
+    return data["phrases"], parse_rewrites(data, snips)
+
+def analyze_messages(snips: Dict[int, str], weak: list[str], strong: list[str]) -> list[dict]:
+    system_prompt = (rewrite_prompt(weak, strong, tool="analyze_and_rewrite")
+                     + ARRAY_SUFFIX + ANALYZE_SUFFIX)
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": snippet_array(snips)}
+    ]
 
-    return rewritten_map
 
 # ─── main endpoint ─────────────────────────────────────────────────────
 @app.post("/rewrite", response_model=RewriteResp)
-def rewrite(req: RewriteReq):
+async def rewrite(req: RewriteReq):
     try:
         snips = req.strings
+        if not worth_rewriting(snips):
+            return {"strings": snips}
+        known_weak, known_strong = await mastery_profile()
+
+        if known_weak or known_strong:
+            # 1+3. Extract and rewrite in one call, primed with the profile
+            phrases, new_snips = await analyze_and_rewrite(snips, known_weak, known_strong)
+
+            # 2. Only keep the rewrite if this page touches the user's mastery
+            weak, strong = await classify_phrases(phrases)
+            if not weak and not strong:
+                new_snips = None
+        else:
+            # No profile yet – nothing to prime with, so go step by step
+            # 1. Extract phrases the model wants mastery for
+            phrases = await extract_phrases(snips)
 
-        # 1. Extract phrases the model wants mastery for
-        phrases = extract_phrases(snips)
-        # print("phrases", phrases)
-
-        # 2. Query mastery (this also starts FAISS on first ever call)
-        weak, strong, _ = mastery.classify(USER, phrases)
-        # print("weak", weak)
-        # print("strong", strong)
+            # 2. Query mastery
+            weak, strong = await classify_phrases(phrases)
 
-        # 3. Rewrite with mastery context (may return None)
-        new_snips = rewrite_snips(snips, weak, strong)
+            # 3. Rewrite with mastery context (may return None)
+            new_snips = await rewrite_snips(snips, weak, strong)
 
         if new_snips is None:
             # No relevant topics → keep original snippets unchanged
             new_snips = snips
-            print("rewrite: skipped LLM rewrite – no mastery context")
-        else:
-            print("new_snips", new_snips)
-        
+
         return {"strings": new_snips}
 
     except (OpenAIError, Exception) as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# ─── rephrase endpoint ─────────────────────────────────────────────────
-@app.post("/rephrase", response_model=RephraseResp)
-def rephrase_text(req: RephraseReq):
+# ─── streaming variant ─────────────────────────────────────────────────
+@app.post("/rewrite_stream")
+async def rewrite_stream(req: RewriteReq):
+    """/rewrite as NDJSON: one ``{"id", "text"}`` line per changed snippet,
+    sent as soon as that snippet is done so the page can patch in place."""
+    try:
+        snips = req.strings
+        weak, strong = [], []
+        if worth_rewriting(snips):
+            # same gate as /rewrite: only the concepts this page touches
+            weak, strong = await classify_phrases(await extract_phrases(snips))
+    except (OpenAIError, Exception) as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def lines():
+        if not weak and not strong:
+            return                      # nothing to personalise
+        try:
+            async for i, text in rewrite_each(snips, weak, strong):
+                if text != snips[i]:
+                    yield orjson.dumps({"id": i, "text": text}) + b"\n"
+        except Exception:               # headers are gone – just end the stream
+            logger.exception("rewrite_stream aborted")
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+# ─── rewrite backfill (OpenAI Batch API) ───────────────────────────────
+
+class BackfillReq(BaseModel):
+    pages: list[Dict[int, str]]
+
+BATCH_POLL_SECS = 60.0
+_BATCH_PENDING = ("validating", "in_progress", "finalizing")
+_BATCH_TASKS: set[asyncio.Task] = set()     # keep pollers referenced
+
+async def ingest_batch(batch_id: str) -> str:
+    """Copy a finished batch's tool-call arguments into the response cache."""
+    batch = await app.state.oai.batches.retrieve(batch_id)
+    if batch.status == "completed" and batch.output_file_id:
+        content = await app.state.oai.files.content(batch.output_file_id)
+        for line in content.text.splitlines():
+            item = orjson.loads(line)
+            try:
+                args = (item["response"]["body"]["choices"][0]["message"]
+                        ["tool_calls"][0]["function"]["arguments"])
+            except (KeyError, IndexError, TypeError):
+                continue                # failed row – /rewrite will go live
+            await asyncio.to_thread(mastery.cache_put, item["custom_id"], args)
+    return batch.status
+
+async def wait_for_batch(batch_id: str) -> None:
+    while (status := await ingest_batch(batch_id)) in _BATCH_PENDING:
+        await asyncio.sleep(BATCH_POLL_SECS)
+    logger.info("Rewrite backfill %s finished: %s", batch_id, status)
+
+@app.post("/rewrite_backfill")
+async def rewrite_backfill(req: BackfillReq):
+    """Pre-compute /rewrite for many pages via the Batch API (half price).
+
+    Each request's ``custom_id`` is its response-cache key, so once the
+    batch completes a later /rewrite of the same page is served from cache.
+    """
     try:
-        # Create a prompt that produces both a summary concept and a rephrase
-        system_prompt = (
-            "You are a helpful assistant. For the given context and selected passage, produce: \n"
-            "1. summary – a SHORT concept name or key phrase (max 5 words) capturing the essence of the user's confusion/question, based on BOTH the selected text and its replacement. Don't use fillers like Understanding. The purpose is to create a vector database of concepts so name it accordingly\n"
-            "2. rephrase – if possible, prefer to keep the original text and simply add a brief explanation in brackets after any jargon or unclear term. Only fully rephrase the text if this would make it much clearer than just adding brackets. Ensure the result still fits grammatically in the original context.\n\n"
-            "Respond ONLY in valid JSON on a single line with keys 'summary' and 'rephrase'."
+        weak, strong = await mastery_profile()
+        if not weak and not strong:
+            return {"status": "skipped", "batch_id": None}
+
+        lines = {}                      # cache key → JSONL row, dedupes pages
+        for snips in req.pages:
+            messages = analyze_messages(snips, weak, strong)
+            key = cache_key(messages, ANALYZE_TOOL, ANALYZE_CHOICE)
+            lines[key] = orjson.dumps({
+                "custom_id": key,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": tool_request(messages, ANALYZE_TOOL, ANALYZE_CHOICE),
+            })
+
+        upload = await app.state.oai.files.create(
+            file=("rewrite_backfill.jsonl", b"\n".join(lines.values())),
+            purpose="batch",
+        )
+        batch = await app.state.oai.batches.create(
+            input_file_id=upload.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
         )
+        task = asyncio.create_task(wait_for_batch(batch.id))
+        _BATCH_TASKS.add(task)
+        task.add_done_callback(_BATCH_TASKS.discard)
+        return {"status": batch.status, "batch_id": batch.id}
 
+    except (OpenAIError, Exception) as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/rewrite_backfill/{batch_id}")
+async def rewrite_backfill_status(batch_id: str):
+    """Poll a backfill once (and ingest it if done) – survives restarts."""
+    try:
+        return {"status": await ingest_batch(batch_id), "batch_id": batch_id}
+    except (OpenAIError, Exception) as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ─── rephrase endpoint ─────────────────────────────────────────────────
+
+@app.post("/rephrase", response_model=RephraseResp)
+async def rephrase_text(req: RephraseReq):
+    try:
         user_prompt = (
             f"Context: {req.parentContext}\n\n"
-            f"Selected text: {req.selectedText}\n\n"
-            "Return the JSON now."
+            f"Selected text: {req.selectedText}"
         )
-        
-        response = client.chat.completions.create(
-            model=MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
+        data = await tool_args(
+            [
+                {"role": "system", "content": REPHRASE_PROMPT},
                 {"role": "user", "content": user_prompt}
             ],
-            temperature=0.3,
-            max_tokens=300
+            tools=REPHRASE_TOOL,
+            tool_choice=REPHRASE_CHOICE
         )
-        raw = response.choices[0].message.content.strip()
-        try:
-            parsed = json.loads(raw)
-            summary   = parsed.get("summary", "").strip()
-            rephrase  = parsed.get("rephrase", "").strip()
-        except json.JSONDecodeError:
-            # fallback: treat whole string as rephrase, empty summary
-            summary = ""
-            rephrase = raw
+        summary  = data["summary"].strip()
+        rephrase = data["rephrase"].strip()
 
         # Log confusion event using summary when available, else selectedText
         concept_to_log = summary or req.selectedText
-        try:
-            mastery.add_event(USER, concept_to_log, "confusion")
-            print(f"Logged confusion event for: {concept_to_log}")
-        except Exception as e:
-            print(f"Failed to log confusion event: {e}")
+        queue_event(concept_to_log, "confusion")
 
         return {"summary": summary, "rephrasedText": rephrase}
         
@@ -314,10 +736,10 @@ def rephrase_text(req: RephraseReq):
 
 # # ─── dwell endpoint ────────────────────────────────────────────────────────
 # @app.post("/dwell", response_model=DwellResp)
-# def log_dwell_event(req: DwellReq):
+# async def log_dwell_event(req: DwellReq):
 #     try:
 #         # Log assumed mastery event for the dwell context
-#         mastery.add_event(USER, req.context, "assumed_mastery")
+#         queue_event(req.context, "assumed_mastery")
 #         print(f"Logged assumed mastery event for dwell context: {req.context[:100]}...")
         
 #         return {
@@ -333,34 +755,37 @@ def rephrase_text(req: RephraseReq):
 
 
 @app.post("/log_confusion")
-def log_confusion(req: ConfReq):
+async def log_confusion(req: ConfReq):
     """Record a confusion signal coming from the MCP observer."""
     try:
-        mastery.add_event(USER, req.concept.strip().lower(), "confusion")
-        print(f"Logged confusion via HTTP: {req.concept}")
+        queue_event(req.concept, "confusion")
+        logger.debug("Queued confusion via HTTP: %s", req.concept)
         return {"status": "ok"}
     except Exception as e:
-<<<<<<< HEAD
-        print(f"Failed to log confusion via HTTP: {e}")
+        logger.error("Failed to log confusion via HTTP: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 # ─── mastery classification endpoint ────────────────────────────────────────
 
 
 @app.post("/mastery_classify", response_model=ClassifyResp)
-def mastery_classify(req: ClassifyReq):
+async def mastery_classify(req: ClassifyReq):
     """Return weak/strong/neutral classification for each phrase."""
     try:
-        weak, strong, neutral = mastery.classify(USER, req.phrases)
+        # FAISS + SQLite – keep it off the event loop
+        weak, strong, neutral = await asyncio.to_thread(mastery.classify, USER, req.phrases)
+
         return {"weak": weak, "strong": strong, "neutral": neutral}
     except Exception as e:
         print(f"Failed to classify mastery: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    
-weave.init('Lenz') # 🐝
-=======
-        print(f"Failed to log dwell event: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
->>>>>>> f303912d054fa6bf14408e0fe331fe69498235fb
-    
-weave.init('Lenz') # 🐝
\ No newline at end of file
+
+if __name__ == "__main__":
+    # Same as `uvicorn server:app --loop uvloop --http httptools` when those are
+    # installed (not on Windows); uvicorn's defaults otherwise. Keep one
+    # worker: the FAISS index and caches live in this process.
+    import importlib.util
+    import uvicorn
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "auto"
+    http = "httptools" if importlib.util.find_spec("httptools") else "auto"
+    uvicorn.run(app, host="127.0.0.1", port=8000, loop=loop, http=http)
@@ -0,0 +1,188 @@
+"""pytest cases for mastery's write and storage paths.
+
+conftest.py points MASTERY_DB at a scratch store shared by the module, so
+each test uses its own user id and concept names.
+"""
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import mastery
+
+
+def _events(user_id):
+    with mastery._conn() as cx:
+        return cx.execute("SELECT concept, weight, ts FROM events WHERE user_id=? ORDER BY rowid",
+                          (user_id,)).fetchall()
+
+
+# ─── add_events / add_event(canonical=) ────────────────────────────────
+def test_add_events_matches_add_event():
+    mastery.add_events("u-bulk", [("  Bayes Rule ", "confusion"), ("VAE", "recall_correct")], ts=100)
+    mastery.add_event("u-single", "  Bayes Rule ", "confusion", ts=100)
+    mastery.add_event("u-single", "VAE", "recall_correct", ts=100)
+    assert _events("u-bulk") == _events("u-single") == [("bayes rule", -1.0, 100), ("vae", 1.0, 100)]
+
+
+def test_add_events_embeds_new_concepts_once():
+    mastery.add_events("u-embed", [("kl divergence", "confusion"), ("kl divergence", "recall_fail")])
+    with mastery._conn() as cx:
+        rows = cx.execute("SELECT vec_row FROM concepts WHERE concept='kl divergence'").fetchall()
+    assert len(rows) == 1 and rows[0][0] is not None
+    assert mastery.FAISS_INDEX.concepts.count("kl divergence") == 1
+
+
+def test_add_events_rejects_unknown_type_before_writing():
+    with pytest.raises(ValueError):
+        mastery.add_events("u-bad", [("a", "confusion"), ("b", "nope")])
+    assert _events("u-bad") == []
+
+
+def test_add_event_canonical_keeps_concept_as_given():
+    mastery.add_event("u-canon", "Mixed Case", "confusion", ts=1, canonical=True)
+    mastery.add_event("u-canon", "Mixed Case", "confusion", ts=1)
+    assert [c for c, _, _ in _events("u-canon")] == ["Mixed Case", "mixed case"]
+
+
+# ─── _RWLock ───────────────────────────────────────────────────────────
+def _start(target):
+    t = threading.Thread(target=target, daemon=True)
+    t.start()
+    return t
+
+
+def test_rwlock_readers_share():
+    lock = mastery._RWLock()
+    both_in = threading.Barrier(2, timeout=2)
+
+    def reader():
+        with lock.read():
+            both_in.wait()              # only passes if two readers hold it at once
+
+    threads = [_start(reader) for _ in range(2)]
+    for t in threads:
+        t.join(3)
+    assert not any(t.is_alive() for t in threads)
+
+
+def test_rwlock_writer_excludes_readers():
+    lock = mastery._RWLock()
+    log = []
+
+    def reader():
+        with lock.read():
+            log.append("read")
+
+    with lock.write():
+        t = _start(reader)
+        time.sleep(0.05)
+        assert log == []                # reader waits for the writer
+        log.append("write done")
+    t.join(2)
+    assert log == ["write done", "read"]
+
+
+def test_rwlock_waiting_writer_goes_first():
+    lock = mastery._RWLock()
+    log = []
+
+    def writer():
+        with lock.write():
+            log.append("write")
+
+    def reader():
+        with lock.read():
+            log.append("late read")
+
+    with lock.read():
+        w = _start(writer)
+        time.sleep(0.05)                # writer now waits for us
+        r = _start(reader)
+        time.sleep(0.05)
+        assert log == []                # new reader queues behind the writer
+    w.join(2)
+    r.join(2)
+    assert log == ["write", "late read"]
+
+
+# ─── _quantise / _dequantise / _migrate_blobs ──────────────────────────
+def _unit_rows(n, seed=0):
+    vecs = np.random.default_rng(seed).standard_normal((n, mastery.EMBED_DIM)).astype(np.float32)
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+def test_quantise_round_trip():
+    vecs = _unit_rows(50)
+    recs = mastery._quantise(vecs)
+    assert recs.dtype == mastery._VEC_DTYPE
+    back = mastery._dequantise(recs)
+    # each element is off by at most half a quantisation step
+    assert (np.abs(back - vecs) <= recs["scale"][:, None] / 2 + 1e-7).all()
+    cos = (back * vecs).sum(axis=1) / np.linalg.norm(back, axis=1)
+    assert cos.min() > 0.999
+
+
+def test_quantise_zero_row():
+    recs = mastery._quantise(np.zeros((1, mastery.EMBED_DIM), dtype=np.float32))
+    assert recs["scale"][0] == 1.0
+    assert not mastery._dequantise(recs).any()
+
+
+def test_append_vecs_skips_torn_tail():
+    size = mastery._VEC_DTYPE.itemsize
+    mastery._append_vecs(mastery._quantise(_unit_rows(1)))   # file ends on a record
+    whole = mastery.VEC_PATH.stat().st_size // size
+    with open(mastery.VEC_PATH, "ab") as f:
+        f.write(b"\x01\x02\x03")         # half-written record from a crash
+    recs = mastery._quantise(_unit_rows(2, seed=2))
+    first = mastery._append_vecs(recs)
+    assert first == whole + 1            # torn record skipped, not overwritten
+    assert mastery.VEC_PATH.stat().st_size == (first + 2) * size
+    assert (mastery._open_vecs()[first:] == recs).all()
+
+
+def test_migrate_blobs_moves_both_layouts():
+    legacy, packed = _unit_rows(2, seed=1)
+    blobs = {
+        "legacy float32 blob": legacy.tobytes(),
+        "packed record blob": mastery._quantise(packed[None, :]).tobytes(),
+    }
+    with mastery._tx() as cx:
+        cx.executemany("INSERT INTO concepts (concept, canonical, embedding) VALUES (?,?,?)",
+                       [(c, c, b) for c, b in blobs.items()])
+    mastery._migrate_blobs()
+    with mastery._conn() as cx:
+        rows = dict(cx.execute("SELECT concept, vec_row FROM concepts WHERE concept IN (?,?) "
+                               "AND embedding IS NULL", list(blobs)).fetchall())
+    assert set(rows) == set(blobs)
+    got = mastery._dequantise(mastery._open_vecs()[[rows["legacy float32 blob"], rows["packed record blob"]]])
+    assert np.allclose(got, [legacy, packed], atol=0.01)
+    mastery._migrate_blobs()                     # nothing left: no-op
+
+
+# ─── saved index ───────────────────────────────────────────────────────
+def test_saved_index_is_reused_and_topped_up(monkeypatch):
+    mastery.add_events("u-persist", [("persisted concept", "confusion")])
+    mastery.save_index()
+    assert mastery._UNSAVED_ADDS == 0
+    saved = list(mastery.FAISS_INDEX.concepts)
+    mtime = mastery.INDEX_PATH.stat().st_mtime_ns
+    mastery.save_index()                          # nothing new: no rewrite
+    assert mastery.INDEX_PATH.stat().st_mtime_ns == mtime
+
+    mastery.add_events("u-persist", [("added after save", "confusion")])
+    rebuilds = []
+    monkeypatch.setattr(mastery, "_rebuild_faiss", lambda: rebuilds.append(1))
+    with mastery.FAISS_LOCK.write():              # what a restart does
+        mastery.FAISS_INDEX = None
+        mastery._load_faiss()
+    assert rebuilds == []
+    concepts = mastery.FAISS_INDEX.concepts
+    assert concepts[:len(saved)] == saved             # saved rows keep their order
+    assert "added after save" in concepts[len(saved):]
+    with mastery._conn() as cx:                       # every embedded concept, once
+        stored = [c for (c,) in cx.execute("SELECT concept FROM concepts WHERE vec_row IS NOT NULL")]
+    assert sorted(concepts) == sorted(stored)
+    assert mastery.FAISS_INDEX.ntotal == len(stored)
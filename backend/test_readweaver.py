@@ -13,7 +13,7 @@ How it works
 """
 
 import requests, time, pathlib, sys, json
-from typing import Dict, Any
+from typing import Dict, Any, List
 from bs4 import BeautifulSoup, NavigableString
 
 SERVER   = "http://127.0.0.1:8000"
@@ -21,23 +21,28 @@ REWRITE  = f"{SERVER}/rewrite"
 DATA_DIR = pathlib.Path(__file__).with_suffix("")      # same folder
 
 # ────────────────────────── helpers ────────────────────────────────────
-def html_to_dict(html: str) -> Dict[str, str]:
+def text_leaves(soup: BeautifulSoup) -> List[NavigableString]:
     """
-    Extract every non-empty visible text node and return
-    { "0": "...", "1": "...", ... } (keys must be *strings* for JSON).
+    Every non-empty visible text node in document order. Walk the tree
+    once per page and hand the list to both helpers below.
+    """
+    # isspace() tests in place; strip() would copy every node just to filter
+    return [n for n in soup.descendants
+            if isinstance(n, NavigableString) and n and not n.isspace()]
+
+
+def html_to_dict(leaves: List[NavigableString]) -> Dict[str, str]:
+    """
+    Return { "0": "...", "1": "...", ... } for *leaves*
+    (keys must be *strings* for JSON).
     """
-    soup   = BeautifulSoup(html, "lxml")
-    leaves = [n for n in soup.descendants
-              if isinstance(n, NavigableString) and n.strip()]
     return {str(i): n.strip() for i, n in enumerate(leaves)}
 
-def patch_html(html: str, rewrites: Dict[str, str]) -> str:
+def patch_html(soup: BeautifulSoup, leaves: List[NavigableString],
+               rewrites: Dict[str, str]) -> str:
     """
     Replace original text nodes in *document order* with rewritten text.
     """
-    soup   = BeautifulSoup(html, "lxml")
-    leaves = [n for n in soup.descendants
-              if isinstance(n, NavigableString) and n.strip()]
     for i, node in enumerate(leaves):
         new = rewrites.get(str(i))
         if new:
@@ -87,12 +92,15 @@ def main():
     for test in TESTS:
         name = test["name"]
         html = test.get("html") or pathlib.Path(test["file"]).read_text()
-        strings = html_to_dict(html)
+        soup    = BeautifulSoup(html, "lxml")          # parsed once per test
+        leaves  = text_leaves(soup)
+        strings = html_to_dict(leaves)
         rewrites = call_rewrite(strings, f"test://{name}")
 
         show_diff(strings, rewrites)
 
-        rewritten_html = patch_html(html, rewrites)
+        rewritten_html = patch_html(soup, leaves, rewrites)
+
         out_path = DATA_DIR / f"{name}_rewritten.html"
         out_path.write_text(rewritten_html, encoding="utf-8")
         print(f"💾 saved -> {out_path}\n" + "-"*60)
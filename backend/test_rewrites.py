@@ -0,0 +1,37 @@
+"""pytest cases for mapping rewrite tool payloads back onto snippets."""
+import orjson
+
+import server
+
+SNIPS = {5: "The prior is updated.", 9: "Hello there.", 12: "Gradients flow back."}
+
+
+def test_snippet_array_is_indexed_by_position():
+    assert orjson.loads(server.snippet_array(SNIPS)) == list(SNIPS.values())
+
+
+def test_parse_rewrites_maps_ids_onto_keys():
+    data = {"rewrites": [{"id": 0, "text": "The prior [belief] is updated."},
+                         {"id": 2, "text": "Gradients [derivatives] flow back."}]}
+    assert server.parse_rewrites(data, SNIPS) == {
+        5: "The prior [belief] is updated.",
+        9: "Hello there.",                       # untouched, still present
+        12: "Gradients [derivatives] flow back.",
+    }
+
+
+def test_parse_rewrites_ignores_out_of_range_ids():
+    data = {"rewrites": [{"id": -1, "text": "x"}, {"id": 3, "text": "y"}, {"id": 1, "text": "Hi."}]}
+    assert server.parse_rewrites(data, SNIPS) == {**SNIPS, 9: "Hi."}
+
+
+def test_nothing_changed_is_none():
+    assert server.parse_rewrites({"rewrites": []}, SNIPS) is None
+    same = {"rewrites": [{"id": i, "text": t} for i, t in enumerate(SNIPS.values())]}
+    assert server.parse_rewrites(same, SNIPS) is None
+
+
+def test_merge_rewrites_keeps_key_order():
+    merged = server.merge_rewrites({12: "new", 5: "also new"}, SNIPS)
+    assert list(merged) == list(SNIPS)
+    assert merged == {5: "also new", 9: "Hello there.", 12: "new"}
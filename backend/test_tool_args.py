@@ -0,0 +1,71 @@
+"""pytest cases for tool_args' single-flight: concurrent identical requests
+share one upstream call, and a cancelled leader hands over to a follower."""
+import asyncio
+
+import pytest
+
+import server
+
+MESSAGES = [{"role": "user", "content": "same request"}]
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Replace the live call with a slow fake; returns the list of its calls."""
+    calls = []
+
+    async def fetch_args(key, messages, tools, tool_choice, near):
+        calls.append(key)
+        await asyncio.sleep(0.05)
+        if messages[0]["content"] == "boom":
+            raise RuntimeError("upstream failed")
+        return '{"n": %d}' % len(calls)
+
+    monkeypatch.setattr(server.mastery, "cache_get", lambda key: None)
+    monkeypatch.setattr(server, "fetch_args", fetch_args)
+    return calls
+
+
+def _call(messages=MESSAGES):
+    return server.tool_args(messages, [], "auto")
+
+
+def test_identical_requests_share_one_call(upstream):
+    async def run():
+        return await asyncio.gather(*(_call() for _ in range(5)))
+
+    assert asyncio.run(run()) == [{"n": 1}] * 5
+    assert len(upstream) == 1
+    assert server._INFLIGHT == {}
+
+
+def test_cancelled_leader_hands_over(upstream):
+    async def run():
+        leader = asyncio.create_task(_call())
+        await asyncio.sleep(0.01)
+        followers = [asyncio.create_task(_call()) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*followers)
+
+    assert asyncio.run(run()) == [{"n": 2}, {"n": 2}]   # one retry, shared
+    assert len(upstream) == 2
+    assert server._INFLIGHT == {}
+
+
+def test_leader_error_reaches_followers(upstream):
+    async def run():
+        msgs = [{"role": "user", "content": "boom"}]
+        return await asyncio.gather(*(_call(msgs) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert len(upstream) == 1
+
+
+def test_cache_hit_skips_upstream(upstream, monkeypatch):
+    monkeypatch.setattr(server.mastery, "cache_get", lambda key: '{"cached": true}')
+    assert asyncio.run(_call()) == {"cached": True}
+    assert upstream == []
@@ -57,20 +57,34 @@ const SOCK = '/tmp/screenpipe_tooltip.sock';
 // Remove stale socket from previous run
 try { fs.unlinkSync(SOCK); } catch (e) { /* ignore */ }
 
-net.createServer(conn => {
-  conn.on('data', buf => {
-    let payload;
-    try   { payload = JSON.parse(buf.toString()); }
-    catch { return; }                     // bad JSON, ignore
+function showTooltip(json) {
+  let payload;
+  try   { payload = JSON.parse(json); }
+  catch { return; }                       // bad JSON, ignore
 
-    const { text = '', duration = 5 } = payload;
+  const { text = '', duration = 5 } = payload;
 
-    // current cursor position
-    const { x, y } = screen.getCursorScreenPoint();
+  // current cursor position
+  const { x, y } = screen.getCursorScreenPoint();
+
+  // forward to renderer
+  mainWindow.webContents.send('display-tooltip', { text, x, y, duration });
+}
 
-    // forward to renderer
-    mainWindow.webContents.send('display-tooltip', { text, x, y, duration });
+// Clients keep the connection open and send frames of
+// [4-byte big-endian length][JSON payload]
+net.createServer(conn => {
+  let pending = Buffer.alloc(0);
+  conn.on('data', buf => {
+    pending = Buffer.concat([pending, buf]);
+    while (pending.length >= 4) {
+      const size = pending.readUInt32BE(0);
+      if (pending.length < 4 + size) break;
+      showTooltip(pending.toString('utf8', 4, 4 + size));
+      pending = pending.subarray(4 + size);
+    }
   });
+  conn.on('error', () => {});             // client went away
 }).listen(SOCK, () => {
   console.log('Tooltip socket listening:', SOCK);
 });
\ No newline at end of file
@@ -5,7 +5,8 @@
  * Usage:
  *    node test_tooltip.js "Your message" 5
  *
- * Sends JSON {text, duration} to /tmp/screenpipe_tooltip.sock.  If the
+ * Sends JSON {text, duration} to /tmp/screenpipe_tooltip.sock as one
+ * length-prefixed frame (4-byte big-endian size, then the JSON).  If the
  * Electron app is running with the socket code, you should see the bubble.
  */
 
@@ -21,9 +22,12 @@ if (!fs.existsSync(SOCK)) {
 const text = process.argv[2] || 'Hello from test_tooltip.js';
 const duration = parseInt(process.argv[3] || '5', 10);
 const payload = JSON.stringify({ text, duration });
+const body = Buffer.from(payload);
+const header = Buffer.alloc(4);
+header.writeUInt32BE(body.length, 0);
 
 const client = net.createConnection(SOCK, () => {
-  client.write(payload, () => {
+  client.write(Buffer.concat([header, body]), () => {
     console.log('Sent payload:', payload);
     client.end();
   });
@@ -1,16 +1,112 @@
 
 import os
+import re
 from crewai import Agent, Task, Crew, Process
 from crewai.tools import BaseTool
+import io
+import queue
 import subprocess
-import json
 import time
 import argparse
 import asyncio
+import atexit
 import sys
+import threading
 import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
+from collections import OrderedDict
 from copy import deepcopy
 
+try:  # orjson is 2–6× faster on the large screenshot payloads
+    import orjson
+
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+
+    def _dumps_sorted(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+except ImportError:  # pragma: no cover – stdlib fallback
+    import json
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, default=str).encode()
+
+    def _dumps_sorted(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, sort_keys=True).encode()
+
+    _loads = json.loads
+
+
+# Seconds to wait for fast_server.py to answer ``initialize`` after spawning.
+# A cold start imports mastery (sentence-transformers, FAISS), which can take
+# well over a minute; a server that exits is reported at once regardless.
+SERVER_READY_TIMEOUT = float(os.getenv("SCREENPIPE_MCP_READY_TIMEOUT", "120"))
+
+# Seconds a read-only tool result may be reused. Both crews grab the current
+# window every cycle, usually before it has changed. Tools not listed here
+# (show_tooltip, log_confusion, start/stop monitoring) have side effects
+# and are never cached.
+RESULT_TTLS = {
+    "get_current_window": 2.0,
+    "get_current_window_with_screenshot": 2.0,
+    "search_window_history": 2.0,
+    "get_screenpipe_status": 2.0,
+    "classify_mastery": 2.0,
+    "classify_mastery_batch": 2.0,
+}
+RESULT_CACHE_MAX = 32
+
+# Tools whose result carries a base-64 ``screenshot`` (hundreds of KB). It is
+# stripped unless the call passes ``"include_screenshot": true``; agents that
+# need the image use get_last_screenshot_path instead.
+WINDOW_TOOLS = {"get_current_window", "get_current_window_with_screenshot"}
+
+_NO_ARGS: dict = {}  # shared by argument-less calls; only ever read
+
+# Sentences that read like a question: one starting with how/what/why/… (OCR
+# lines often lack the final punctuation) or anything ending in "?". Found
+# here so the observer LLM ranks a few candidates instead of scanning the
+# whole OCR dump.
+QUESTION_RE = re.compile(
+    r"(?:^|(?<=[.!?]))[ \t]*(?:how|what|why|when|where|explain|who)\b[^.!?\n]*\??"
+    r"|[^.!?\n]+\?",
+    re.I | re.M,
+)
+
+
+def _preprocess_ocr(text: str, limit: int = 8) -> list[str]:
+    """Up to *limit* distinct question-like sentences from *text*, in order."""
+    found: dict[str, str] = {}
+    for m in QUESTION_RE.finditer(text):
+        sentence = m.group().strip()
+        found.setdefault(sentence.lower(), sentence)
+        if len(found) == limit:
+            break
+    return list(found.values())
+
+
+def _strip_screenshot(result):
+    """Drop the ``screenshot`` field from a window tool result.
+
+    Handles both the bare dict returned in-process and the MCP tool-call
+    result (``structuredContent`` plus JSON ``text`` content items).
+    """
+    if not isinstance(result, dict):
+        return result
+    result.pop("screenshot", None)
+    if isinstance(result.get("structuredContent"), dict):
+        result["structuredContent"].pop("screenshot", None)
+    for item in result.get("content") or ():
+        if item.get("type") != "text" or '"screenshot"' not in item.get("text", ""):
+            continue
+        try:
+            payload = _loads(item["text"])
+        except ValueError:
+            continue
+        if isinstance(payload, dict):
+            payload.pop("screenshot", None)
+            item["text"] = _dumps(payload).decode()
+    return result
 
 # Set up OpenAI API key
 os.environ["OPENAI_API_KEY"] = ""
@@ -20,8 +116,9 @@ class ScreenPipeTool(BaseTool):
 
     The constructor launches the Node-based MCP server (`server.js`) once and keeps
     the process alive. Subsequent tool invocations communicate with the server
-    over stdio using the official JSON-RPC 2.0 messages defined by MCP.  Each
-    `_run` call accepts a **command string** in the form:
+    over stdio using the official JSON-RPC 2.0 messages defined by MCP.  (By
+    default the fast_server tools are instead imported and called in-process;
+    see ``in_process``.)  Each `_run` call accepts a **command string** in the form:
 
         "tool_name"               – e.g. ``get_current_window``
         "tool_name {json_args}"   – e.g. ``search_window_history {\"query\": \"chrome\"}``
@@ -39,8 +136,13 @@ class ScreenPipeTool(BaseTool):
         "retrieve OCR, screenshots, and historical window data."
     )
 
-    def __init__(self, server_cwd: str | None = None):  # noqa: D401
-        """Launch the MCP server and prepare for JSON-RPC communication."""
+    def __init__(self, server_cwd: str | None = None, in_process: bool = True):  # noqa: D401
+        """Launch the MCP server and prepare for JSON-RPC communication.
+
+        With *in_process* (the default) the fast_server tool functions are
+        imported and awaited directly, with no subprocess, pipe or JSON-RPC
+        round-trip. Pass ``in_process=False`` to drive fast_server.py over stdio.
+        """
         super().__init__()
 
         # Directory that contains server.js – default to this file's folder.
@@ -49,7 +151,25 @@ class ScreenPipeTool(BaseTool):
         )
 
         self._server_proc: subprocess.Popen | None = None
+        self._stdin: io.BufferedWriter | None = None
+        self._stdout: io.BufferedReader | None = None
         self._next_id: int = 1
+        # Replies are read by one thread and routed by id to the waiting
+        # caller, so both crews can have tool calls in flight at once.
+        self._pending: dict[int, queue.Queue] = {}
+        self._reader_eof = False
+        self._rpc_lock = threading.Lock()  # guards id allocation + stdin writes
+        # (tool, sorted-JSON args) -> (expires_at, result JSON), LRU order
+        self._cache: OrderedDict[tuple[str, bytes], tuple[float, str]] = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+        # Never leave an orphaned fast_server.py behind, however we exit.
+        atexit.register(self._shutdown)
+
+        self._handlers: dict | None = None
+        if in_process:
+            self._load_handlers()
+            return
 
         self._start_server()
         # Perform MCP initialization handshake once
@@ -71,8 +191,9 @@ class ScreenPipeTool(BaseTool):
             "clientInfo": {"name": "ScreenPipeTool", "version": "0.1.0"},
         }
 
-        # 1. initialize request
-        _ = self._send_rpc_raw("initialize", init_request)
+        # 1. initialize request – doubles as the readiness probe: the pipe
+        #    holds the request until the server starts reading stdin.
+        _ = self._send_rpc_raw("initialize", init_request, timeout=SERVER_READY_TIMEOUT)
 
         # 2. initialized notification (no id)
         self._send_notification("notifications/initialized", {})
@@ -83,6 +204,29 @@ class ScreenPipeTool(BaseTool):
     # Private helpers
     # ---------------------------------------------------------------------
 
+    def _load_handlers(self) -> None:
+        """Import fast_server's tools and give them a long-lived event loop."""
+        if self._cwd not in sys.path:
+            sys.path.insert(0, self._cwd)
+        import fast_server
+
+        self._handlers = dict(fast_server.TOOLS)
+        # One loop shared by every caller thread. It stays up between calls so
+        # start_window_monitoring's poll task keeps running.
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="mcp-inproc", daemon=True).start()
+
+    def _call_in_process(self, tool_name: str, arguments: dict):
+        """Await a fast_server tool on the shared loop and return its raw result."""
+        assert self._handlers is not None
+        handler = self._handlers.get(tool_name)
+        if handler is None:
+            raise RuntimeError(f"MCP Error: unknown tool {tool_name!r}")
+        try:
+            return asyncio.run_coroutine_threadsafe(handler(**arguments), self._loop).result()
+        except Exception as exc:  # mirror the server's isError result
+            return {"isError": True, "error": str(exc)}
+
     def _start_server(self) -> None:
         """Spawn the Node MCP server if it is not already running."""
         if self._server_proc is not None and self._server_proc.poll() is None:
@@ -96,80 +240,119 @@ class ScreenPipeTool(BaseTool):
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,   # <- restore PIPE for JSON-RPC replies
             stderr=None,              # inherit parent stderr -> logging visible
-            text=True,
+            text=False,               # raw bytes in/out – orjson speaks UTF-8
+            bufsize=0,                # unbuffered raw pipes, wrapped below
             cwd=self._cwd,
         )
-
-        # Give the server a moment to initialize.
-        time.sleep(2)
-
-    def _send_rpc(self, method: str, params: dict | None = None) -> dict:
+        # 1 MB buffers: screenshot replies are hundreds of KB, so readline()
+        # fills in a few large reads instead of many pipe-sized ones.
+        self._stdin = io.BufferedWriter(self._server_proc.stdin, buffer_size=1 << 20)
+        self._stdout = io.BufferedReader(self._server_proc.stdout, buffer_size=1 << 20)
+
+        self._pending = {}
+        self._reader_eof = False
+        threading.Thread(target=self._read_replies, name="mcp-reader", daemon=True).start()
+
+    def _read_replies(self) -> None:
+        """Reader thread: hand each reply line to the caller waiting on its id."""
+        assert self._stdout is not None
+        while line := self._stdout.readline():
+            try:
+                msg = _loads(line)
+            except ValueError:
+                print(f"Invalid JSON from MCP server: {line[:200]!r}")
+                continue
+            # Server-initiated notifications carry no id and nobody waits on them.
+            waiter = self._pending.pop(msg.get("id"), None)
+            if waiter is not None:
+                waiter.put(msg)
+
+        # EOF – the server is gone; wake every caller still waiting.
+        with self._rpc_lock:
+            self._reader_eof = True
+            for waiter in self._pending.values():
+                waiter.put(None)
+            self._pending.clear()
+
+    def _call(self, method: str, params: dict | None, timeout: float | None = None) -> dict | None:
+        """Write one request and block until its reply arrives (None on EOF).
+
+        Only the id allocation and the write hold the lock, so several threads
+        can have requests in flight at once; replies are matched up by id.
+        """
+        waiter: queue.Queue = queue.Queue(maxsize=1)
+        with self._rpc_lock:
+            if self._reader_eof:
+                return None
+            request_id = self._next_id
+            self._next_id += 1
+            self._pending[request_id] = waiter
+
+            request = {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "method": method,
+                "params": params or {},
+            }
+            assert self._stdin is not None  # for mypy
+            self._stdin.write(_dumps(request))
+            self._stdin.write(b"\n")  # separate write: no concat copy of the payload
+            self._stdin.flush()
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                return waiter.get(timeout=0.5)
+            except queue.Empty:
+                pass
+            if self._server_proc.poll() is not None:
+                # Gone: normally the reader hits EOF and wakes us, but a helper
+                # it spawned may still hold stdout open, so don't wait for that.
+                try:
+                    return waiter.get(timeout=1.0)  # a reply sent just before exiting
+                except queue.Empty:
+                    self._pending.pop(request_id, None)
+                    return None
+            if deadline is not None and time.monotonic() >= deadline:
+                self._pending.pop(request_id, None)
+                raise RuntimeError(f"MCP server did not answer {method} within {timeout:.0f}s")
+
+    def _rpc(
+        self,
+        method: str,
+        params: dict | None = None,
+        *,
+        check_error: bool = True,
+        timeout: float | None = None,
+    ) -> dict:
         """Send a JSON-RPC request and synchronously wait for the response."""
-
         if not self._server_proc or self._server_proc.poll() is not None:
             if self._server_proc and self._server_proc.stderr:
-                err = self._server_proc.stderr.read().strip()
+                err = self._server_proc.stderr.read().decode(errors="replace").strip()
                 if err:
                     print("\n=== fast_server stderr ===\n" + err + "\n=== end ===")
             raise RuntimeError("MCP server is not running")
 
-        request = {
-            "jsonrpc": "2.0",
-            "id": self._next_id,
-            "method": method,
-            "params": params or {},
-        }
-        self._next_id += 1
-
-        # Write request
-        assert self._server_proc.stdin is not None  # for mypy
-        self._server_proc.stdin.write(json.dumps(request) + "\n")
-        self._server_proc.stdin.flush()
-
-        # Read a single line response (all MCP responses are delimited by newline)
-        assert self._server_proc.stdout is not None  # for mypy
-        response_line = self._server_proc.stdout.readline()
-        if response_line == "":
+        response = self._call(method, params, timeout)
+        if response is None:
             # Check for server errors captured on stderr
-            stderr = self._server_proc.stderr.read() if self._server_proc.stderr else ""
+            stderr = self._server_proc.stderr.read().decode(errors="replace") if self._server_proc.stderr else ""
             raise RuntimeError(f"No response from MCP server. Stderr: {stderr}")
 
-        try:
-            response: dict = json.loads(response_line.strip())
-        except json.JSONDecodeError as exc:
-            raise RuntimeError(f"Invalid JSON from MCP server: {response_line}") from exc
-
-        if "error" in response:
+        if check_error and "error" in response:
             raise RuntimeError(f"MCP Error: {response['error']}")
 
         return response
 
-    def _send_rpc_raw(self, method: str, params: dict | None = None) -> dict:
-        """Lower-level RPC helper bypassing initialization guard."""
-        if not self._server_proc or self._server_proc.poll() is not None:
-            if self._server_proc and self._server_proc.stderr:
-                err = self._server_proc.stderr.read().strip()
-                if err:
-                    print("\n=== fast_server stderr ===\n" + err + "\n=== end ===")
-            raise RuntimeError("MCP server is not running")
-
-        request = {
-            "jsonrpc": "2.0",
-            "id": self._next_id,
-            "method": method,
-            "params": params or {},
-        }
-        self._next_id += 1
-
-        assert self._server_proc.stdin is not None
-        self._server_proc.stdin.write(json.dumps(request) + "\n")
-        self._server_proc.stdin.flush()
+    def _send_rpc(self, method: str, params: dict | None = None) -> dict:
+        """Send a request and raise on a JSON-RPC error response."""
+        return self._rpc(method, params)
 
-        assert self._server_proc.stdout is not None
-        line = self._server_proc.stdout.readline()
-        if line == "":
-            raise RuntimeError("No response during initialization")
-        return json.loads(line.strip())
+    def _send_rpc_raw(
+        self, method: str, params: dict | None = None, timeout: float | None = None
+    ) -> dict:
+        """Lower-level RPC helper bypassing initialization guard."""
+        return self._rpc(method, params, check_error=False, timeout=timeout)
 
     def _send_notification(self, method: str, params: dict | None = None) -> None:
         if not self._server_proc or self._server_proc.poll() is not None:
@@ -180,15 +363,17 @@ class ScreenPipeTool(BaseTool):
             "method": method,
             "params": params or {},
         }
-        assert self._server_proc.stdin is not None
-        self._server_proc.stdin.write(json.dumps(notification) + "\n")
-        self._server_proc.stdin.flush()
+        assert self._stdin is not None
+        with self._rpc_lock:
+            self._stdin.write(_dumps(notification))
+            self._stdin.write(b"\n")
+            self._stdin.flush()
 
     # ------------------------------------------------------------------
     # BaseTool API
     # ------------------------------------------------------------------
 
-    def _run(self, command: str) -> str:  # noqa: D401
+    def _run(self, command: str, *, ttl: float | None = None) -> str:  # noqa: D401
         """Execute a ScreenPipe MCP tool call.
 
         Parameters
@@ -200,44 +385,87 @@ class ScreenPipeTool(BaseTool):
 
                 get_current_window
                 search_window_history {"query": "gmail", "limit": 5}
+        ttl: float | None
+            Override the tool's RESULT_TTLS entry for this call, e.g. to
+            prefetch a result that should last a whole agent cycle.
         """
 
         # ------------------------------------------------------------------
         # Parse input
         # ------------------------------------------------------------------
-        cmd_parts = command.strip().split(" ", 1)
-        tool_name = cmd_parts[0]
+        tool_name, sep, rest = command.strip().partition(" ")
         try:
-            arguments = json.loads(cmd_parts[1]) if len(cmd_parts) > 1 else {}
-        except json.JSONDecodeError as exc:
+            arguments = _loads(rest) if sep else _NO_ARGS
+        except ValueError as exc:
             raise ValueError(
                 "Arguments must be a valid JSON object, e.g."
                 "  'search_window_history {\"query\": \"foo\"}'"
             ) from exc
 
-        # ------------------------------------------------------------------
-        # Send request via JSON-RPC
-        # ------------------------------------------------------------------
-        response = self._send_rpc(
-            "tools/call",
-            {
-                "name": tool_name,
-                "arguments": arguments,
-            },
-        )
+        if ttl is None:
+            ttl = RESULT_TTLS.get(tool_name, 0.0)
+        key = (tool_name, _dumps_sorted(arguments))
+
+        keep_screenshot = arguments.get("include_screenshot") is True
+        if tool_name == "get_current_window_with_screenshot":
+            arguments.pop("include_screenshot", None)  # tool takes no arguments
+        if ttl:
+            with self._cache_lock:
+                hit = self._cache.get(key)
+                if hit and hit[0] > time.monotonic():
+                    self._cache.move_to_end(key)
+                    return hit[1]
+
+        if self._handlers is not None:
+            raw = self._call_in_process(tool_name, arguments)
+        else:
+            # ------------------------------------------------------------------
+            # Send request via JSON-RPC
+            # ------------------------------------------------------------------
+            response = self._send_rpc(
+                "tools/call",
+                {
+                    "name": tool_name,
+                    "arguments": arguments,
+                },
+            )
+            raw = response["result"]
+
+        if tool_name in WINDOW_TOOLS and not keep_screenshot:
+            raw = _strip_screenshot(raw)
 
         # Return the raw JSON so the CrewAI agent can decide how to parse it.
-        return json.dumps(response["result"], ensure_ascii=False)
+        result = _dumps(raw).decode()
+
+        if ttl and not (isinstance(raw, dict) and raw.get("isError")):
+            with self._cache_lock:
+                self._cache[key] = (time.monotonic() + ttl, result)
+                self._cache.move_to_end(key)
+                if len(self._cache) > RESULT_CACHE_MAX:
+                    self._cache.popitem(last=False)
+        return result
 
     # ------------------------------------------------------------------
     # Cleanup helpers (optional)
     # ------------------------------------------------------------------
 
     def _shutdown(self) -> None:
-        """Terminate the underlying Node process cleanly."""
+        """Terminate the underlying Node process cleanly (safe to call twice)."""
+        if self._handlers is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
         if self._server_proc and self._server_proc.poll() is None:
             self._server_proc.terminate()
-            self._server_proc.wait()
+            try:
+                self._server_proc.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self._server_proc.kill()
+                self._server_proc.wait()
+
+    def __enter__(self) -> "ScreenPipeTool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._shutdown()
 
 # Create a ScreenPipe tool instance – the server launches automatically
 screenpipe_tool = ScreenPipeTool()
@@ -252,7 +480,8 @@ screen_observer_agent = Agent(
         "You watch the live OCR feed and look for explicit questions the user types or reads—e.g. Google searches, ChatGPT queries, YouTube 'How do I …' titles.\n"
         "Your mission: extract short phrase(s) that reflect what the user is confused about and log each via the ScreenPipe *log_confusion* tool.\n\n"
         "Available ScreenPipe methods:\n"
-        "• get_current_window_with_screenshot – OCR + screenshot\n"
+        "• get_current_window_with_screenshot – OCR text of the focused window\n"
+        "• get_last_screenshot_path – file path of the latest screenshot (only if you need the image)\n"
         "• search_window_history – query previous OCR text\n"
         "• log_confusion – <NEW> record a confusion event (arguments: {text})\n\n"
         "Usage rules are identical: pass a single field `command` that contains the tool name and JSON arguments if needed.\n"
@@ -266,14 +495,16 @@ screen_observer_agent = Agent(
 )
 
 # Create a task for the observer agent
+OBSERVE_DESCRIPTION = (
+    "1. Capture current window with `get_current_window_with_screenshot`.\n"
+    "2. Look for any sentence or query that ends with a '?' or begins with words like 'how', 'what', 'why', 'explain', etc. These indicate the user is asking a question.\n"
+    "3. From the OCR text, extract concise concept phrases (≤4 words each) that summarise the user's uncertainty.\n"
+    "4. For each phrase call `log_confusion` via ScreenPipe to record it.\n"
+    "5. After one log finish"
+)
+
 observe_task = Task(
-    description=(
-        "1. Capture current window with `get_current_window_with_screenshot`.\n"
-        "2. Look for any sentence or query that ends with a '?' or begins with words like 'how', 'what', 'why', 'explain', etc. These indicate the user is asking a question.\n"
-        "3. From the OCR text, extract concise concept phrases (≤4 words each) that summarise the user's uncertainty.\n"
-        "4. For each phrase call `log_confusion` via ScreenPipe to record it.\n"
-        "5. After one log finish"
-    ),
+    description=OBSERVE_DESCRIPTION,
     expected_output="A JSON list of phrases that were logged via log_confusion.",
     agent=screen_observer_agent,
 )
@@ -302,7 +533,8 @@ intervention_agent = Agent(
         "Use ScreenPipe to inspect the current window. If the user appears to be reading educational "
         "material or coding docs, surface a 1-sentence helpful explanation using the show_tooltip command.\n"
         "Available ScreenPipe methods (use exactly one per Action):\n"
-        "• get_current_window_with_screenshot – OCR + screenshot\n"
+        "• get_current_window_with_screenshot – OCR text of the focused window\n"
+        "• get_last_screenshot_path – file path of the latest screenshot (only if you need the image)\n"
         "• classify_mastery – POST phrases to backend and get weak/strong/neutral\n"
         "• show_tooltip – render a 1-sentence tooltip on screen\n\n"
         "Calling convention: send a single JSON field `command` whose value is the tool name plus JSON args if needed.\n"
@@ -352,17 +584,41 @@ if __name__ == "__main__":
     parser.add_argument("--delay", type=int, default=10, help="Seconds between cycles")
     args = parser.parse_args()
 
-    try:
-        while True:
-            if args.mode in ("observer", "both"):
-                print("\n=== Observer cycle ===")
-                # fresh crew each time
-                Crew(agents=[screen_observer_agent], tasks=[observe_task], process=Process.sequential).kickoff()
-
-            if args.mode in ("intervention", "both"):
-                print("\n=== Intervention cycle ===")
-                Crew(agents=[intervention_agent], tasks=[intervention_task], process=Process.sequential).kickoff()
+    # Build the crews once; in "both" mode they run side by side each cycle,
+    # so a cycle costs the slower crew's LLM round-trips, not the sum.
+    crews = []
+    if args.mode in ("observer", "both"):
+        crews.append(("Observer", Crew(agents=[screen_observer_agent], tasks=[observe_task], process=Process.sequential)))
+    if args.mode in ("intervention", "both"):
+        crews.append(("Intervention", Crew(agents=[intervention_agent], tasks=[intervention_task], process=Process.sequential)))
 
-            time.sleep(args.delay)
+    try:
+        with ThreadPoolExecutor(max_workers=len(crews)) as ex:
+            while True:
+                t0 = time.monotonic()
+                print("\n=== " + " + ".join(name for name, _ in crews) + " cycle ===")
+                # Capture the window once per cycle; each crew's own capture
+                # call is then a cache hit instead of a second OCR fetch.
+                window = _loads(screenpipe_tool._run("get_current_window_with_screenshot", ttl=args.delay))
+                if isinstance(window.get("structuredContent"), dict):
+                    window = window["structuredContent"]   # subprocess result shape
+                if questions := _preprocess_ocr(window.get("text") or ""):
+                    observe_task.description = OBSERVE_DESCRIPTION + (
+                        "\n\nQuestion-like sentences already found on screen "
+                        "(rank and filter these rather than rescanning the OCR):\n"
+                        + "\n".join(f"- {q}" for q in questions)
+                    )
+                else:
+                    observe_task.description = OBSERVE_DESCRIPTION
+                futures = [ex.submit(crew.kickoff) for _, crew in crews]
+                wait(futures)
+                for f in futures:
+                    f.result()  # re-raise a crew's exception here
+
+                # Fixed cadence: sleep only what is left of the period.
+                remaining = args.delay - (time.monotonic() - t0)
+                if remaining > 0:
+                    time.sleep(remaining)
     except KeyboardInterrupt:
-        print("\nStopping agent loop…")
\ No newline at end of file
+        print("\nStopping agent loop…")
+        screenpipe_tool._shutdown()
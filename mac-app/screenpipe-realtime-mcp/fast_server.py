@@ -19,18 +19,30 @@
 # The ScreenPipe desktop app must already be running on http://localhost:3030.
 # """
 import asyncio
+import base64
+import collections
 import contextlib
+import hashlib
 import json
 import logging
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
-
-import requests
+import random
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+import orjson
 from mcp.server.fastmcp import FastMCP  # type: ignore
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+
+try:  # optional linear-time engine for the weak-concept scan (pip install google-re2)
+    import re2 as _scan_re  # type: ignore
+except ImportError:
+    _scan_re = re
 
 # --- ensure repo-root/backend is on PYTHONPATH --------------------------------
-import subprocess, socket, os, json
+import socket, os, json
 from pathlib import Path
 import sys
 
@@ -45,9 +57,60 @@ import mastery  # now resolvable
 # Consistent user identifier across backend & MCP
 USER_ID = "browser_user"
 
+# Window polling: drop to the floor right after a change, stretch ×1.5 per
+# unchanged poll (×2 per failed one) up to the ceiling, plus ≤25 % jitter.
+POLL_MIN_SECS = 0.5
+POLL_MAX_SECS = 5.0
+
+# search_window_history calls with the same filters arriving within this window
+# share one /search request (sent with the largest limit, sliced per caller)
+SEARCH_COALESCE_SECS = 0.05
+
+# Changed frames the poll loop remembers for search_window_history
+HISTORY_MAX = 256
+
+# How long the compiled weak-concept pattern is reused (matches the backend's
+# PROFILE_TTL_SECS)
+WEAK_TERMS_TTL_SECS = 30.0
+
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 logger = logging.getLogger("screenpipe-fastmcp")
 
+# ---------------------------------------------------------------------------
+# Weak-concept scan over OCR text
+# ---------------------------------------------------------------------------
+
+_weak_re: Optional[Any] = None  # one alternation of the user's weak concepts
+_weak_re_expires = 0.0
+
+
+async def refresh_weak_terms() -> None:
+    """Recompile the weak-concept pattern from mastery once it is stale."""
+    global _weak_re, _weak_re_expires
+    now = time.monotonic()
+    if now < _weak_re_expires:
+        return
+    _weak_re_expires = now + WEAK_TERMS_TTL_SECS
+    try:
+        weak, _ = await asyncio.to_thread(mastery.profile, USER_ID)
+    except Exception as exc:
+        logger.warning("Could not load mastery profile: %s", exc)
+        return
+    # longest first so "gradient descent" wins over "gradient"
+    alt = "|".join(re.escape(t) for t in sorted(weak, key=len, reverse=True))
+    _weak_re = _scan_re.compile(rf"(?i)\b(?:{alt})\b") if alt else None
+
+
+def scan_text(text: str) -> List[str]:
+    """Weak concepts found in *text*, once each, in order of appearance.
+
+    A single pass over the text however many concepts the pattern holds.
+    """
+    if _weak_re is None:
+        return []
+    return list(dict.fromkeys(m.lower() for m in _weak_re.findall(text)))
+
+
 # ---------------------------------------------------------------------------
 # Helper class that talks to the ScreenPipe HTTP API
 # ---------------------------------------------------------------------------
@@ -56,6 +119,8 @@ logger = logging.getLogger("screenpipe-fastmcp")
 class WindowState(BaseModel):
     """Structured return type for `get_current_window`."""
 
+    model_config = ConfigDict(populate_by_name=True)  # accept app_name= as well as appName=
+
     timestamp: datetime
     app_name: str = Field(alias="appName")
     window_name: str = Field(alias="windowName")
@@ -64,6 +129,24 @@ class WindowState(BaseModel):
     screenshot: Optional[str] = None  # base64 PNG
 
 
+def _parse_ts(value: str) -> datetime:
+    """ISO-8601 string → aware datetime; naive values are taken as UTC."""
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+class _SearchBatch:
+    """One pending /search shared by every caller with the same filters."""
+
+    __slots__ = ("future", "limit", "sent", "task")
+
+    def __init__(self, limit: int) -> None:
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.limit = limit
+        self.sent = False  # limit is fixed once the request has gone out
+        self.task: Optional[asyncio.Task] = None
+
+
 class ScreenPipeRealtime:
     """Thin Python port of the realtime logic in server.js."""
 
@@ -72,43 +155,110 @@ class ScreenPipeRealtime:
         self.is_streaming: bool = False
         self._poll_task: Optional[asyncio.Task] = None
         self._last_update: Optional[str] = None  # ISO string timestamp
+        self._interval: float = 2.0  # current poll period, see POLL_MIN/MAX_SECS
+        self._last_hash: Optional[int] = None  # content hash of current_window_state
+        # get_current_window results for one frame, keyed by (include_screenshot, include_text)
+        self._result_frame: Optional[Tuple[int, str]] = None
+        self._cached_result: Dict[Tuple[bool, bool], Dict[str, Any]] = {}
+        # /search params that never change; each poll adds only start_time
+        self._base_params: Dict[str, Any] = {"limit": 1, "content_type": "ocr", "focused": "true"}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._inflight: Dict[Tuple, _SearchBatch] = {}  # search filters -> pending batch
+        # (timestamp, /search-shaped item) per changed frame seen by the poll loop
+        self._history: "collections.deque[Tuple[datetime, Dict[str, Any]]]" = collections.deque(
+            maxlen=HISTORY_MAX
+        )
+        self.last_screenshot: Optional[str] = None  # base64 PNG, for get_last_screenshot_path
+        self.weak_on_screen: List[str] = []  # scan_text hits for current_window_state
+        self._weak_frame: Optional[int] = None  # content hash weak_on_screen was scanned from
 
     # --------------------------- public helpers ---------------------------
 
+    def client(self) -> httpx.AsyncClient:
+        """Shared keep-alive client for ScreenPipe and the Lenz backend.
+
+        Its requests are awaited (not blocking, as ``requests`` did), so the poll loop
+        and concurrent tool calls overlap on one event loop.
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                # retry refused/reset connects (e.g. ScreenPipe restarting);
+                # pool limits live on the transport once one is passed
+                transport=httpx.AsyncHTTPTransport(
+                    retries=2,
+                    limits=httpx.Limits(max_connections=10, keepalive_expiry=60),
+                ),
+                timeout=5,
+            )
+        return self._client
+
     async def get_latest_window_content(self, include_screenshot: bool = True) -> Optional[WindowState]:
+        fetched = await self._fetch_window(include_screenshot)
+        return None if fetched is None else WindowState.model_validate(fetched[1])
+
+    def tool_result(
+        self, fetched: Tuple[int, Dict[str, Any]], include_screenshot: bool, include_text: bool
+    ) -> Dict[str, Any]:
+        """Serialized `get_current_window` result for *fetched*, memoized per frame.
+
+        Agents chaining tool calls often hit the same frame repeatedly; only the
+        first call pays for validation, dumping and text truncation.
+        """
+        frame = (fetched[0], fetched[1]["timestamp"])
+        if frame != self._result_frame:
+            self._result_frame = frame
+            self._cached_result.clear()
+        key = (include_screenshot, include_text)
+        result = self._cached_result.get(key)
+        if result is None:
+            result = WindowState.model_validate(fetched[1]).model_dump(by_alias=True)
+            if include_text:
+                # stop splitting after 200 words instead of tokenizing the whole OCR dump
+                words = result["text"].split(None, 200)
+                if len(words) > 200:
+                    result["text"] = " ".join(words[:200]) + " …"
+            else:
+                result.pop("text", None)
+            self._cached_result[key] = result
+        return dict(result)  # callers may strip fields
+
+    async def _fetch_window(self, include_screenshot: bool) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """Latest focused frame as ``(content hash, raw WindowState dict)``.
+
+        The 64-bit blake2b hash covers text, app and window name, so the poll
+        loop can drop a re-captured but unchanged screen before validating it.
+        """
+        t = time.time() - 5
         five_seconds_ago = (
-            (datetime.utcnow() - timedelta(seconds=5))
-            .isoformat(timespec="milliseconds") + "Z"
+            time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(t)) + f".{int(t * 1000) % 1000:03d}Z"
         )
         base_url = "http://localhost:3030/search"
-        params = {
-            "limit": 1,
-            "content_type": "ocr",
-            "start_time": five_seconds_ago,
-            "focused": "true",
-        }
+        params = {**self._base_params, "start_time": five_seconds_ago}
+        if include_screenshot:
+            # fetch the frame in the same round-trip
+            params["include_frames"] = "true"
 
         try:
-            resp = requests.get(base_url, params=params, timeout=3)
+            resp = await self.client().get(base_url, params=params, timeout=3)
             if resp.status_code != 200:
                 logger.warning("ScreenPipe /search %s → %s", resp.url, resp.status_code)
                 logger.warning("Response: %s", resp.text[:300])
             resp.raise_for_status()
-        except requests.RequestException as exc:
+        except httpx.HTTPError as exc:
             # Retry *without* start_time, as ScreenPipe sometimes rejects ISO strings with ms
             if "start_time" in params:
                 params.pop("start_time")
                 try:
-                    resp = requests.get(base_url, params=params, timeout=3)
+                    resp = await self.client().get(base_url, params=params, timeout=3)
                     resp.raise_for_status()
-                except requests.RequestException:
+                except httpx.HTTPError:
                     logger.error("HTTP error querying ScreenPipe: %s", exc)
                     return None
             else:
                 logger.error("HTTP error querying ScreenPipe: %s", exc)
                 return None
 
-        data = resp.json().get("data", [])
+        data = orjson.loads(resp.content).get("data", [])
         if not data:
             return None
 
@@ -119,33 +269,27 @@ class ScreenPipeRealtime:
             "windowName": content.get("window_name", "Unknown"),
             "text": content.get("text", ""),
             "focused": bool(content.get("focused", False)),
-            "screenshot": None,
+            "screenshot": content.get("frame") if include_screenshot else None,
         }
 
-        if include_screenshot:
-            if frame := content.get("frame"):
-                window_state["screenshot"] = frame
-            else:
-                # Fallback query asking for frames
-                try:
-                    params_with_frames = {
-                        **params,
-                        "include_frames": "true",
-                    }
-                    r2 = requests.get(base_url, params=params_with_frames, timeout=3)
-                    r2.raise_for_status()
-                    d2 = r2.json().get("data", [])
-                    if d2 and d2[0]["content"].get("frame"):
-                        window_state["screenshot"] = d2[0]["content"]["frame"]
-                except requests.RequestException:
-                    pass
-
-        return WindowState.parse_obj(window_state)
+        if window_state["screenshot"]:
+            self.last_screenshot = window_state["screenshot"]
+        key = "\x1f".join((window_state["text"], window_state["appName"], window_state["windowName"]))
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "little"), window_state
+
+    async def weak_concepts(self, fetched: Tuple[int, Dict[str, Any]]) -> List[str]:
+        """Weak concepts in *fetched*'s OCR text, reusing the poll loop's scan of that frame."""
+        if fetched[0] == self._weak_frame:
+            return self.weak_on_screen
+        await refresh_weak_terms()
+        return scan_text(fetched[1]["text"])
 
     async def start_realtime_monitoring(self) -> None:
         if self.is_streaming:
             return
         self.is_streaming = True
+        self._history.clear()  # frames from before a stop would leave a gap
         self._poll_task = asyncio.create_task(self._poll_loop())
         logger.info("📡 Started realtime monitoring loop")
 
@@ -158,6 +302,13 @@ class ScreenPipeRealtime:
             self._poll_task = None
         logger.info("🛑 Stopped realtime monitoring loop")
 
+    async def aclose(self) -> None:
+        """Stop polling and close the shared client (server shutdown only)."""
+        await self.stop_realtime_monitoring()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
     async def search_window_history(
         self,
         query: Optional[str] = None,
@@ -167,11 +318,18 @@ class ScreenPipeRealtime:
         end_time: Optional[str] = None,
         limit: int = 10,
         include_screenshots: bool = False,
+        focused_history: bool = False,
     ) -> List[Dict[str, Any]]:
+        if focused_history and not include_screenshots:
+            hits = self._search_history(query, app_name, window_name, start_time, end_time, limit)
+            if hits is not None:
+                return hits
+
         params: Dict[str, Any] = {
             "content_type": "ocr",
-            "limit": limit,
         }
+        if focused_history:
+            params["focused"] = "true"  # same frames the ring would hold
         if query:
             params["q"] = query
         if app_name:
@@ -185,40 +343,146 @@ class ScreenPipeRealtime:
         if include_screenshots:
             params["include_frames"] = "true"
 
+        # Ensure datetime params have Z and no microseconds to avoid 400 errors
+        if "start_time" in params:
+            params["start_time"] = params["start_time"].replace("Z", "")
+        if "end_time" in params:
+            params["end_time"] = params["end_time"].replace("Z", "")
+
+        key = tuple(sorted(params.items()))
+        batch = self._inflight.get(key)
+        if batch is None or (batch.sent and limit > batch.limit):
+            batch = self._inflight[key] = _SearchBatch(limit)
+            batch.task = asyncio.create_task(self._run_search(key, params, batch))
+        elif not batch.sent:
+            batch.limit = max(batch.limit, limit)
+        # shield: one caller giving up must not cancel the others' result
+        return (await asyncio.shield(batch.future))[:limit]
+
+    def _search_history(
+        self,
+        query: Optional[str],
+        app_name: Optional[str],
+        window_name: Optional[str],
+        start_time: Optional[str],
+        end_time: Optional[str],
+        limit: int,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Answer a search from the poll loop's ring buffer, or None to ask ScreenPipe.
+
+        Filters are case-insensitive substrings.  The ring is trusted only while
+        monitoring runs and only when *start_time* is no older than its oldest
+        entry; open-ended searches always go to ScreenPipe.
+        """
+        if not start_time or not self.is_streaming or not self._history:
+            return None
         try:
-            # Ensure datetime params have Z and no microseconds to avoid 400 errors
-            if "start_time" in params:
-                params["start_time"] = params["start_time"].replace("Z", "")
-            if "end_time" in params:
-                params["end_time"] = params["end_time"].replace("Z", "")
-            r = requests.get("http://localhost:3030/search", params=params, timeout=5)
+            start = _parse_ts(start_time)
+            end = _parse_ts(end_time) if end_time else None
+        except ValueError:
+            return None
+        if start < self._history[0][0]:
+            return None  # older than the ring reaches
+        needles = [
+            (field, value.lower())
+            for field, value in (("text", query), ("app_name", app_name), ("window_name", window_name))
+            if value
+        ]
+        hits: List[Dict[str, Any]] = []
+        for ts, item in reversed(self._history):  # newest first, like /search
+            if end and ts > end:
+                continue
+            if ts < start:
+                break
+            content = item["content"]
+            if all(needle in content[field].lower() for field, needle in needles):
+                hits.append(item)
+                if len(hits) == limit:
+                    break
+        return hits
+
+    async def _run_search(self, key: Tuple, params: Dict[str, Any], batch: _SearchBatch) -> None:
+        try:
+            # let identical queries join, but only wait while other searches are busy
+            await asyncio.sleep(SEARCH_COALESCE_SECS if len(self._inflight) > 1 else 0)
+            batch.sent = True
+            r = await self.client().get(
+                "http://localhost:3030/search", params={**params, "limit": batch.limit}
+            )
             r.raise_for_status()
-            return r.json().get("data", [])
-        except requests.RequestException as exc:
+            batch.future.set_result(orjson.loads(r.content).get("data", []))
+        except httpx.HTTPError as exc:
             logger.error("Search failed: %s", exc)
-            return []
+            batch.future.set_result([])
+        except asyncio.CancelledError:
+            batch.future.cancel()  # don't leave joined callers waiting forever
+            raise
+        except Exception as exc:
+            batch.future.set_exception(exc)
+        finally:
+            if self._inflight.get(key) is batch:
+                del self._inflight[key]
 
-    async def check_health(self) -> bool:
+    async def health(self) -> Optional[Dict[str, Any]]:
+        """ScreenPipe's /health body, or None if it is unreachable or unhealthy."""
         try:
-            r = requests.get("http://localhost:3030/health", timeout=3)
+            r = await self.client().get("http://localhost:3030/health", timeout=3)
             r.raise_for_status()
-            return True
-        except requests.RequestException:
-            return False
+        except httpx.HTTPError:
+            return None
+        try:
+            return orjson.loads(r.content)
+        except orjson.JSONDecodeError:
+            return {}
+
+    async def check_health(self) -> bool:
+        return await self.health() is not None
 
     # --------------------------- internal ---------------------------
 
     async def _poll_loop(self) -> None:
         while self.is_streaming:
             try:
-                state = await self.get_latest_window_content(include_screenshot=True)
-                if state and state.timestamp.isoformat() != self._last_update:
+                fetched = await self._fetch_window(include_screenshot=True)
+                if fetched is None:             # ScreenPipe down / no data
+                    self._interval *= 2
+                elif fetched[0] != self._last_hash:
+                    # only a real content change pays for validation + notify
+                    self._last_hash = fetched[0]
+                    # screenshots go to last_screenshot only; this state lives until
+                    # the content changes and would otherwise pin a stale frame
+                    state = WindowState.model_validate({**fetched[1], "screenshot": None})
                     self.current_window_state = state
                     self._last_update = state.timestamp.isoformat()
                     self._notify_subscribers(state)
+                    self._remember(state, fetched[1]["timestamp"])
+                    await refresh_weak_terms()
+                    self.weak_on_screen = scan_text(state.text)
+                    self._weak_frame = fetched[0]
+                    if self.weak_on_screen:
+                        logger.info("💡 Weak concepts on screen: %s", ", ".join(self.weak_on_screen))
+                    self._interval = POLL_MIN_SECS
+                else:
+                    self._interval *= 1.5
             except Exception as exc:
                 logger.error("Polling error: %s", exc)
-            await asyncio.sleep(2)
+                self._interval *= 2
+            self._interval = min(POLL_MAX_SECS, self._interval)
+            await asyncio.sleep(self._interval + random.uniform(0, 0.25 * self._interval))
+
+    def _remember(self, state: WindowState, timestamp: str) -> None:
+        """Append *state* to the history ring as a /search result item."""
+        ts = state.timestamp
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=timezone.utc)
+        content = {
+            "timestamp": timestamp,
+            "app_name": state.app_name,
+            "window_name": state.window_name,
+            "text": state.text,
+            "focused": state.focused,
+        }
+        self._history.append((ts, {"type": "OCR", "content": content}))
 
     def _notify_subscribers(self, state: WindowState) -> None:
         # Placeholder – real implementation would push over MCP notifications.
@@ -229,7 +493,36 @@ class ScreenPipeRealtime:
 # FastMCP server definition
 # ---------------------------------------------------------------------------
 
-mcp = FastMCP("screenpipe-realtime")
+
+class _FrozenToolsMCP(FastMCP):
+    """FastMCP that builds the ``tools/list`` result once and reuses it.
+
+    Every tool is registered at import, so the list never changes after the
+    first request; ``add_tool`` still drops the snapshot.  (``remove_tool``
+    is not overridden: not every supported mcp version has it.)
+    """
+
+    _tools_list: Optional[list] = None
+
+    def add_tool(self, *args: Any, **kwargs: Any) -> None:
+        self._tools_list = None
+        super().add_tool(*args, **kwargs)
+
+    async def list_tools(self) -> list:
+        if self._tools_list is None:
+            self._tools_list = await super().list_tools()
+        return self._tools_list
+
+
+@contextlib.asynccontextmanager
+async def _lifespan(_server: FastMCP) -> AsyncIterator[None]:
+    try:
+        yield
+    finally:
+        await _realtime.aclose()  # tools share one client; close it once, here
+
+
+mcp = _FrozenToolsMCP("screenpipe-realtime", lifespan=_lifespan)
 _realtime = ScreenPipeRealtime()
 
 
@@ -238,21 +531,18 @@ async def get_current_window(
     include_screenshot: bool = True,
     include_text: bool = True,
 ) -> Dict[str, Any]:
-    """Return the most recent focused window captured by ScreenPipe."""
+    """Return the most recent focused window captured by ScreenPipe.
+
+    `weakConcepts` lists the user's weak concepts that appear in its text.
+    """
     logger.info("🛠️  get_current_window(include_screenshot=%s, include_text=%s)", include_screenshot, include_text)
-    state = await _realtime.get_latest_window_content(include_screenshot)
-    if state is None:
+    fetched = await _realtime._fetch_window(include_screenshot)
+    if fetched is None:
         return {
             "error": "No current window content. Is ScreenPipe running?",
         }
-    # Convert to dict and optionally strip text
-    result = state.dict(by_alias=True)
-    if include_text and "text" in result:
-        words = result["text"].split()
-        if len(words) > 200:
-            result["text"] = " ".join(words[:200]) + " …"
-    if not include_text:
-        result.pop("text", None)
+    result = _realtime.tool_result(fetched, include_screenshot, include_text)
+    result["weakConcepts"] = await _realtime.weak_concepts(fetched)
     return result
 
 
@@ -272,6 +562,34 @@ async def get_current_window_with_screenshot() -> Dict[str, Any]:  # noqa: D401
     return await get_current_window(include_screenshot=True, include_text=True)
 
 
+SHOT_PATH = Path("/tmp/screenpipe_last_screenshot.png")
+_shot_written: Optional[int] = None  # hash() of the base64 frame currently at SHOT_PATH
+
+
+@mcp.tool(name="get_last_screenshot_path")
+async def get_last_screenshot_path() -> str:
+    """Write the most recent screenshot to disk and return its file path.
+
+    Window tools hand agents OCR text only; an agent that actually needs the
+    image reads it from this path instead of receiving base-64 in the result.
+    """
+    global _shot_written
+    logger.info("🛠️  get_last_screenshot_path()")
+    shot = _realtime.last_screenshot
+    if not shot:
+        return "No screenshot captured yet"
+    # agents often ask again for the same frame; skip the decode + rewrite then
+    if hash(shot) != _shot_written or not SHOT_PATH.exists():
+        # multi-MB decode + write: keep it off the event loop
+        await asyncio.to_thread(_write_shot, shot)
+        _shot_written = hash(shot)
+    return str(SHOT_PATH)
+
+
+def _write_shot(shot: str) -> None:
+    SHOT_PATH.write_bytes(base64.b64decode(shot))
+
+
 # ---------------------------------------------------------------------------
 # UI Intervention: show_tooltip (macOS Notification as lightweight tooltip)
 # ---------------------------------------------------------------------------
@@ -279,6 +597,75 @@ async def get_current_window_with_screenshot() -> Dict[str, Any]:  # noqa: D401
 SOCK_PATH = "/tmp/screenpipe_tooltip.sock"
 HELPER = Path(__file__).with_name("tooltip_helper.py")
 
+# One connection to the overlay, kept open between tooltips
+_tooltip_sock: Optional[socket.socket] = None
+_tooltip_lock = asyncio.Lock()
+
+
+async def _send_tooltip(payload: bytes) -> None:
+    """Write *payload* to the overlay as a 4-byte big-endian length-prefixed frame.
+
+    Reuses the cached socket and reconnects once if the overlay has gone away.
+    """
+    global _tooltip_sock
+    loop = asyncio.get_running_loop()
+    frame = len(payload).to_bytes(4, "big") + payload
+    async with _tooltip_lock:
+        for attempt in range(2):
+            if _tooltip_sock is None:
+                s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                s.setblocking(False)
+                try:
+                    await loop.sock_connect(s, SOCK_PATH)
+                except OSError:
+                    s.close()
+                    raise
+                _tooltip_sock = s
+            try:
+                await loop.sock_sendall(_tooltip_sock, frame)
+                return
+            except (BrokenPipeError, ConnectionResetError):
+                _tooltip_sock.close()
+                _tooltip_sock = None
+                if attempt:
+                    raise
+
+
+# Reaper tasks for detached tooltip helpers (held so they aren't GC'd)
+_helper_waits: set = set()
+
+
+async def _spawn_detached(*argv: str) -> None:
+    """Start *argv* without blocking the event loop or waiting for it to exit."""
+    devnull = asyncio.subprocess.DEVNULL
+    # shield: a cancelled tool call must not abandon the helper mid-spawn
+    proc = await asyncio.shield(
+        asyncio.create_subprocess_exec(*argv, stdin=devnull, stdout=devnull, stderr=devnull)
+    )
+    reaper = asyncio.create_task(proc.wait())
+    _helper_waits.add(reaper)
+    reaper.add_done_callback(_helper_waits.discard)
+
+
+_helper_daemon_tried = False  # tooltip_helper --daemon is launched at most once
+
+
+async def _start_helper_daemon() -> None:
+    """Launch tooltip_helper as a socket daemon when no overlay is listening.
+
+    The daemon speaks the same framing on SOCK_PATH as the Electron overlay, so
+    later tooltips are a socket write instead of a Python + pyobjc start-up.
+    """
+    global _helper_daemon_tried
+    if _helper_daemon_tried or sys.platform != "darwin" or not HELPER.exists():
+        return
+    _helper_daemon_tried = True
+    await _spawn_detached(sys.executable, str(HELPER), "--daemon", SOCK_PATH)
+    for _ in range(40):                     # pyobjc import takes a moment
+        if os.path.exists(SOCK_PATH):
+            return
+        await asyncio.sleep(0.05)
+
 
 # Register as MCP tool
 @mcp.tool(name="show_tooltip")
@@ -295,30 +682,30 @@ async def show_tooltip(text: str, duration: int | None = 5) -> str:
     """
     logger.info("🛠️  show_tooltip text='%s' duration=%s", text[:60], duration)
 
-    payload = json.dumps({"text": text[:200], "duration": duration})
+    payload = orjson.dumps({"text": text[:200], "duration": duration})
 
-    # 1) Try unix domain socket to Electron overlay
+    # 1) Try unix domain socket to the Electron overlay or native helper daemon
+    if not os.path.exists(SOCK_PATH):
+        await _start_helper_daemon()
     if os.path.exists(SOCK_PATH):
         try:
-            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
-                s.connect(SOCK_PATH)
-                s.sendall(payload.encode())
-            return "Tooltip sent via Electron socket"
+            await _send_tooltip(payload)
+            return "Tooltip sent via overlay socket"
         except Exception as exc:
             logger.warning("Socket tooltip delivery failed: %s", exc)
 
     # 2) Fallback: launch native helper script (requires pyobjc)
     if HELPER.exists():
-        subprocess.Popen([sys.executable, str(HELPER), text[:200], str(duration or 4)])
+        await _spawn_detached(sys.executable, str(HELPER), text[:200], str(duration or 4))
         return "Tooltip shown via native helper"
 
     # 3) Final fallback: macOS banner
     try:
-        subprocess.Popen([
+        await _spawn_detached(
             "osascript",
             "-e",
             f'display notification {json.dumps(text[:200])} with title "ScreenPipe"',
-        ])
+        )
         return "Tooltip sent via macOS banner"
     except FileNotFoundError:
         logger.error("No tooltip mechanism available")
@@ -349,7 +736,14 @@ async def search_window_history(
     end_time: Optional[str] = None,
     limit: int = 10,
     include_screenshots: bool = False,
+    focused_history: bool = False,
 ) -> List[Dict[str, Any]]:
+    """Search ScreenPipe's OCR history.
+
+    With `focused_history`, only focused-window frames are searched, and while
+    monitoring covers `start_time` they come from the frames the poll loop saw
+    (matched as case-insensitive substrings) without a ScreenPipe round trip.
+    """
     logger.info("🛠️  search_window_history query='%s' app=%s window=%s limit=%s", query, app_name, window_name, limit)
     return await _realtime.search_window_history(
         query=query,
@@ -359,15 +753,16 @@ async def search_window_history(
         end_time=end_time,
         limit=limit,
         include_screenshots=include_screenshots,
+        focused_history=focused_history,
     )
 
 
 @mcp.tool(name="get_screenpipe_status")
 async def get_screenpipe_status() -> Dict[str, Any]:
     logger.info("🛠️  get_screenpipe_status()")
-    if not await _realtime.check_health():
+    data = await _realtime.health()
+    if data is None:
         return {"status": "unreachable"}
-    data = requests.get("http://localhost:3030/health", timeout=3).json()
     return {"status": "healthy", **data, "monitoring": _realtime.is_streaming}
 
 
@@ -376,19 +771,45 @@ async def get_screenpipe_status() -> Dict[str, Any]:
 # ---------------------------------------------------------------------------
 
 
+# Concurrent POSTs allowed in flight to the backend (batched tools fan out)
+_backend_slots = asyncio.Semaphore(8)
+
+
+async def _post_json(url: str, body: Any) -> httpx.Response:
+    """POST *body* to the Lenz backend, encoded with orjson."""
+    async with _backend_slots:
+        return await _realtime.client().post(
+            url,
+            content=orjson.dumps(body),
+            headers={"Content-Type": "application/json"},
+            timeout=30,
+        )
+
+
 @mcp.tool(name="classify_mastery")
 async def classify_mastery(phrases: List[str]) -> Dict[str, List[str]]:  # noqa: D401
     """Return weak/strong/neutral lists for the given phrases via backend."""
 
     BACKEND = os.getenv("BACKEND_URL", "http://127.0.0.1:8000")
     try:
-        resp = requests.post(f"{BACKEND}/mastery_classify", json={"phrases": phrases})
+        resp = await _post_json(f"{BACKEND}/mastery_classify", {"phrases": phrases})
         resp.raise_for_status()
-        return resp.json()
-    except requests.RequestException as exc:
+        return orjson.loads(resp.content)
+    except httpx.HTTPError as exc:
         return {"error": str(exc)}
 
 
+@mcp.tool(name="classify_mastery_batch")
+async def classify_mastery_batch(phrases: List[List[str]]) -> List[Dict[str, Any]]:  # noqa: D401
+    """Classify several phrase lists at once; result *i* belongs to ``phrases[i]``.
+
+    Each result is what `classify_mastery` returns for that list: weak/strong/neutral
+    lists, or ``{"error": ...}`` if its backend request failed.  The backend
+    requests run concurrently, so N lists cost about one round trip.
+    """
+    return list(await asyncio.gather(*(classify_mastery(group) for group in phrases)))
+
+
 @mcp.tool(name="log_confusion")
 async def log_confusion(concept: str | None = None, text: str | None = None) -> str:  # noqa: D401
     """Record a confusion event via mastery.add_event.
@@ -402,14 +823,38 @@ async def log_confusion(concept: str | None = None, text: str | None = None) ->
         return "No concept given"
 
     BACKEND = os.getenv("BACKEND_URL", "http://127.0.0.1:8000")
-    resp = requests.post(f"{BACKEND}/log_confusion", json={"concept": phrase})
-    return f"Logged: {phrase}" if resp.ok else f"Failed: {resp.text}"
+    resp = await _post_json(f"{BACKEND}/log_confusion", {"concept": phrase})
+    return f"Logged: {phrase}" if resp.is_success else f"Failed: {resp.text}"
+
+
+# Tool name -> coroutine function, for callers that import this module and
+# call the tools in-process instead of over stdio (see crewai_agents.py).
+TOOLS = {
+    "get_current_window": get_current_window,
+    "get_current_window_with_screenshot": get_current_window_with_screenshot,
+    "get_last_screenshot_path": get_last_screenshot_path,
+    "show_tooltip": show_tooltip,
+    "start_window_monitoring": start_window_monitoring,
+    "stop_window_monitoring": stop_window_monitoring,
+    "search_window_history": search_window_history,
+    "get_screenpipe_status": get_screenpipe_status,
+    "classify_mastery": classify_mastery,
+    "classify_mastery_batch": classify_mastery_batch,
+    "log_confusion": log_confusion,
+}
 
 
 # ---------------------------------------------------------------------------
 # Entry point
 # ---------------------------------------------------------------------------
 
+
 if __name__ == "__main__":
     # When run directly, start a production-style server (stdio transport).
+    try:  # libuv loop: cheaper tool dispatch + poll-loop sleeps/sockets
+        import uvloop
+
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
     mcp.run() 
\ No newline at end of file
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""pytest cases for ScreenPipeTool's client-side helpers.
+
+The tool runs in-process with its fast_server handlers swapped for counting
+fakes, so nothing talks to ScreenPipe.
+"""
+import json
+import time
+
+import pytest
+
+import crewai_agents
+from crewai_agents import ScreenPipeTool, _preprocess_ocr, _strip_screenshot
+
+
+@pytest.fixture
+def tool():
+    calls: list = []
+
+    async def status():
+        calls.append("status")
+        return {"ok": len(calls)}
+
+    async def search_window_history(**kwargs):
+        calls.append(kwargs)
+        return {"data": [kwargs]}
+
+    async def show_tooltip(**kwargs):
+        calls.append("tooltip")
+        return {"shown": True}
+
+    async def broken():
+        raise RuntimeError("ScreenPipe is down")
+
+    t = ScreenPipeTool()
+    t._handlers = {
+        "get_screenpipe_status": status,
+        "search_window_history": search_window_history,
+        "show_tooltip": show_tooltip,
+        "classify_mastery": broken,
+    }
+    t.calls = calls
+    yield t
+    t._shutdown()
+
+
+def test_result_is_reused_within_ttl(tool):
+    first = tool._run("get_screenpipe_status")
+    assert tool._run("get_screenpipe_status") == first
+    assert len(tool.calls) == 1
+
+
+def test_result_expires_after_ttl(tool, monkeypatch):
+    monkeypatch.setitem(crewai_agents.RESULT_TTLS, "get_screenpipe_status", 0.05)
+    tool._run("get_screenpipe_status")
+    time.sleep(0.06)
+    assert json.loads(tool._run("get_screenpipe_status")) == {"ok": 2}
+
+
+def test_cache_key_ignores_argument_order(tool):
+    tool._run('search_window_history {"query": "vae", "limit": 5}')
+    tool._run('search_window_history {"limit": 5, "query": "vae"}')
+    tool._run('search_window_history {"limit": 6, "query": "vae"}')
+    assert len(tool.calls) == 2
+
+
+def test_side_effect_tools_and_errors_are_not_cached(tool):
+    tool._run('show_tooltip {"text": "hi"}')
+    tool._run('show_tooltip {"text": "hi"}')
+    assert tool.calls == ["tooltip", "tooltip"]
+    assert json.loads(tool._run("classify_mastery"))["isError"] is True
+    assert not tool._cache
+
+
+def test_ttl_override_and_lru_bound(tool, monkeypatch):
+    tool._run("show_tooltip", ttl=10)  # normally uncached
+    tool._run("show_tooltip", ttl=10)
+    tool._run("show_tooltip")  # no ttl of its own: always calls through
+    assert tool.calls == ["tooltip", "tooltip"]
+
+    monkeypatch.setattr(crewai_agents, "RESULT_CACHE_MAX", 3)
+    for i in range(5):
+        tool._run(f'search_window_history {{"limit": {i}}}')
+    assert len(tool._cache) == 3
+    assert ("show_tooltip", b"{}") not in tool._cache  # oldest evicted first
+
+
+def test_strip_screenshot_bare_and_mcp_results():
+    assert _strip_screenshot({"app": "Code", "screenshot": "AAAA"}) == {"app": "Code"}
+    result = {
+        "structuredContent": {"app": "Code", "screenshot": "AAAA"},
+        "content": [
+            {"type": "text", "text": json.dumps({"app": "Code", "screenshot": "AAAA"})},
+            {"type": "text", "text": '"screenshot" is not JSON'},
+            {"type": "image", "data": "AAAA"},
+        ],
+    }
+    _strip_screenshot(result)
+    assert result["structuredContent"] == {"app": "Code"}
+    assert json.loads(result["content"][0]["text"]) == {"app": "Code"}
+    assert result["content"][1:] == [
+        {"type": "text", "text": '"screenshot" is not JSON'},
+        {"type": "image", "data": "AAAA"},
+    ]
+    assert _strip_screenshot("plain text") == "plain text"
+
+
+def test_window_tools_drop_screenshot_unless_asked(tool):
+    async def window(**kwargs):
+        return {"app": "Code", "screenshot": "AAAA"}
+
+    tool._handlers["get_current_window"] = window
+    assert json.loads(tool._run("get_current_window")) == {"app": "Code"}
+    kept = json.loads(tool._run('get_current_window {"include_screenshot": true}'))
+    assert kept["screenshot"] == "AAAA"
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("Intro. How does backprop work\nSome code", ["How does backprop work"]),
+        ("Is this convex? It is. why not", ["Is this convex?", "why not"]),
+        ("What is a VAE? what is a vae? WHAT IS A VAE?", ["What is a VAE?"]),
+        ("Whatever happens. Shown below.", []),
+        ("", []),
+    ],
+)
+def test_preprocess_ocr_finds_questions(text, expected):
+    assert _preprocess_ocr(text) == expected
+
+
+def test_preprocess_ocr_limit():
+    text = " ".join(f"Question {i}?" for i in range(20))
+    assert _preprocess_ocr(text, limit=3) == ["Question 0?", "Question 1?", "Question 2?"]
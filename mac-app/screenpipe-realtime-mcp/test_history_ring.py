@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""pytest cases for search_window_history's ring-buffer path.
+
+The ring only holds focused frames the poll loop saw, so it may answer only
+``focused_history`` searches whose ``start_time`` it covers.  The last test
+checks it against a live ScreenPipe and is skipped when none is running.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from fast_server import ScreenPipeRealtime, WindowState
+
+T0 = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _iso(dt: datetime) -> str:
+    return dt.isoformat().replace("+00:00", "Z")
+
+
+def _realtime(requests: list) -> ScreenPipeRealtime:
+    """A monitoring-on instance with three remembered frames and a fake /search."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(dict(request.url.params))
+        return httpx.Response(200, json={"data": [{"type": "OCR", "content": {"text": "from search"}}]})
+
+    rt = ScreenPipeRealtime()
+    rt._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    rt.is_streaming = True
+    for i, (app, text) in enumerate([("Chrome", "Bayes rule"), ("Code", "def vae()"), ("Chrome", "VAE paper")]):
+        ts = T0 + timedelta(seconds=i)
+        state = WindowState(timestamp=ts, appName=app, windowName=app, text=text, focused=True)
+        rt._remember(state, _iso(ts))
+    return rt
+
+
+def _search(rt: ScreenPipeRealtime, **kwargs):
+    return asyncio.run(rt.search_window_history(**kwargs))
+
+
+def test_ring_answers_covered_focused_search():
+    requests: list = []
+    rt = _realtime(requests)
+    hits = _search(rt, query="vae", start_time=_iso(T0), focused_history=True)
+    assert [h["content"]["text"] for h in hits] == ["VAE paper", "def vae()"]  # newest first
+    assert requests == []
+
+
+def test_ring_respects_end_time_and_limit():
+    rt = _realtime([])
+    hits = _search(rt, app_name="chrome", start_time=_iso(T0), end_time=_iso(T0 + timedelta(seconds=1)),
+                   focused_history=True)
+    assert [h["content"]["text"] for h in hits] == ["Bayes rule"]
+    assert len(_search(rt, start_time=_iso(T0), limit=2, focused_history=True)) == 2
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"query": "vae", "start_time": _iso(T0)},  # not asked for focused history
+        {"query": "vae", "focused_history": True},  # open-ended
+        {"start_time": _iso(T0 - timedelta(seconds=1)), "focused_history": True},  # older than the ring
+        {"start_time": _iso(T0), "focused_history": True, "include_screenshots": True},
+    ],
+)
+def test_ring_defers_to_search(kwargs):
+    requests: list = []
+    rt = _realtime(requests)
+    hits = _search(rt, **kwargs)
+    assert [h["content"]["text"] for h in hits] == ["from search"]
+    assert len(requests) == 1
+    assert (requests[0].get("focused") == "true") == bool(kwargs.get("focused_history"))
+
+
+def test_ring_off_when_not_monitoring():
+    requests: list = []
+    rt = _realtime(requests)
+    rt.is_streaming = False
+    _search(rt, start_time=_iso(T0), focused_history=True)
+    assert len(requests) == 1
+
+
+def _screenpipe_up() -> bool:
+    try:
+        return httpx.get("http://localhost:3030/health", timeout=1).is_success
+    except httpx.HTTPError:
+        return False
+
+
+@pytest.mark.skipif(not _screenpipe_up(), reason="ScreenPipe is not running on :3030")
+def test_ring_matches_search():
+    """Every frame the ring returns is one /search returns for the same filters."""
+
+    async def run():
+        rt = ScreenPipeRealtime()
+        await rt.start_realtime_monitoring()
+        try:
+            await asyncio.sleep(15)  # a few polls; switch windows meanwhile for more frames
+            start = _iso(rt._history[0][0])  # oldest frame, so the ring covers it
+            ring = rt._search_history(None, None, None, start, None, 50)
+            rt.is_streaming = False  # force the /search path, same filters
+            live = await rt.search_window_history(start_time=start, limit=1000, focused_history=True)
+        finally:
+            await rt.aclose()
+        return ring, live
+
+    ring, live = asyncio.run(run())
+    assert ring is not None
+    live_frames = {(i["content"]["timestamp"], i["content"]["app_name"]) for i in live}
+    for item in ring:
+        assert (item["content"]["timestamp"], item["content"]["app_name"]) in live_frames
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""pytest cases for search_window_history's /search coalescer.
+
+Identical filters arriving together share one request, sent with the largest
+limit and sliced per caller.
+"""
+import asyncio
+import time
+
+import httpx
+
+from fast_server import ScreenPipeRealtime
+
+
+def _realtime(requests: list, status: int = 200) -> ScreenPipeRealtime:
+    """An instance whose /search answers *limit* items after 50 ms."""
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        params = dict(request.url.params)
+        requests.append(params)
+        await asyncio.sleep(0.05)
+        data = [{"i": i, "q": params.get("q")} for i in range(int(params["limit"]))]
+        return httpx.Response(status, json={"data": data})
+
+    rt = ScreenPipeRealtime()
+    rt._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return rt
+
+
+def test_identical_queries_share_one_request():
+    requests: list = []
+
+    async def run():
+        rt = _realtime(requests)
+        return await asyncio.gather(
+            rt.search_window_history("a", limit=3),
+            rt.search_window_history("a", limit=10),
+            rt.search_window_history("b", limit=2),
+        )
+
+    a3, a10, b2 = asyncio.run(run())
+    assert (len(a3), len(a10), len(b2)) == (3, 10, 2)
+    assert sorted((r["q"], r["limit"]) for r in requests) == [("a", "10"), ("b", "2")]
+
+
+def test_late_caller_with_larger_limit_sends_again():
+    requests: list = []
+
+    async def run():
+        rt = _realtime(requests)
+        first = asyncio.create_task(rt.search_window_history("a", limit=5))
+        await asyncio.sleep(0.02)  # first request is on the wire
+        return await asyncio.gather(
+            first,
+            rt.search_window_history("a", limit=4),  # fits: shares it
+            rt.search_window_history("a", limit=8),  # doesn't: new request
+        )
+
+    results = asyncio.run(run())
+    assert [len(r) for r in results] == [5, 4, 8]
+    assert [r["limit"] for r in requests] == ["5", "8"]
+
+
+def test_http_error_gives_every_caller_empty_results():
+    requests: list = []
+
+    async def run():
+        rt = _realtime(requests, status=500)
+        results = await asyncio.gather(*(rt.search_window_history("a") for _ in range(3)))
+        return results, rt._inflight
+
+    results, inflight = asyncio.run(run())
+    assert results == [[], [], []]
+    assert len(requests) == 1
+    assert inflight == {}
+
+
+def test_one_caller_giving_up_does_not_cancel_the_others():
+    async def run():
+        rt = _realtime([])
+        t1 = asyncio.create_task(rt.search_window_history("a", limit=2))
+        t2 = asyncio.create_task(rt.search_window_history("a", limit=2))
+        await asyncio.sleep(0.01)
+        t1.cancel()
+        return await t2
+
+    assert len(asyncio.run(run())) == 2
+
+
+def test_cancelled_request_releases_its_callers():
+    async def run():
+        rt = _realtime([])
+        callers = [asyncio.create_task(rt.search_window_history("a")) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        next(iter(rt._inflight.values())).task.cancel()
+        results = await asyncio.wait_for(asyncio.gather(*callers, return_exceptions=True), 1)
+        return results, rt._inflight
+
+    results, inflight = asyncio.run(run())
+    assert all(isinstance(r, asyncio.CancelledError) for r in results)
+    assert inflight == {}
+
+
+def test_uncontended_search_does_not_wait():
+    requests: list = []
+
+    async def run():
+        rt = _realtime(requests)
+        start = time.monotonic()
+        await rt.search_window_history("solo")
+        return time.monotonic() - start
+
+    # 50 ms of fake /search latency, no extra coalescing window on top
+    assert asyncio.run(run()) < 0.05 + 0.04
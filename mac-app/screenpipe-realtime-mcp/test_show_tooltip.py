@@ -10,6 +10,7 @@ then call the tool.  Look for a macOS banner notification to verify success.
 """
 
 import json
+import os
 import subprocess
 import sys
 import time
@@ -28,11 +29,11 @@ class RpcProc:
             cmd,
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
-            text=True,
             cwd=str(ROOT),
-            bufsize=1,
+            bufsize=0,
         )
         self._id = 1
+        self._buf = b""  # stdout bytes not yet split into messages
 
     def req(self, method: str, params=None):
         msg = {
@@ -50,15 +51,19 @@ class RpcProc:
 
     def _write(self, obj):
         assert self.proc.stdin
-        self.proc.stdin.write(json.dumps(obj) + "\n")
-        self.proc.stdin.flush()
+        self.proc.stdin.write(json.dumps(obj).encode() + b"\n")
 
     def _read(self):
         assert self.proc.stdout
-        line = self.proc.stdout.readline()
-        if line == "":
-            raise RuntimeError("Server terminated")
-        return json.loads(line.strip())
+        # MCP stdio is newline-delimited JSON; read in large chunks so a
+        # multi-hundred-KB screenshot result takes a handful of 64 KB reads
+        while b"\n" not in self._buf:
+            chunk = os.read(self.proc.stdout.fileno(), 65536)
+            if not chunk:
+                raise RuntimeError("Server terminated")
+            self._buf += chunk
+        line, _, self._buf = self._buf.partition(b"\n")
+        return json.loads(line)
 
     def close(self):
         if self.proc.poll() is None:
@@ -3,13 +3,25 @@
 
 Usage:
     python tooltip_helper.py "Message" 5
+    python tooltip_helper.py --daemon [/tmp/screenpipe_tooltip.sock]
 
 Displays a rounded rectangle with translucent background near the current
 cursor location, auto-closes after N seconds.  Requires `pyobjc`.
+
+With ``--daemon`` the helper keeps running and shows a tooltip for every
+message received on the UNIX socket, so interpreter and pyobjc start-up are
+paid once.  Messages use the Electron overlay's framing: a 4-byte big-endian
+length followed by JSON ``{"text": ..., "duration": ...}``.
 """
 from __future__ import annotations
+import json
+import os
+import socket
 import sys
+import threading
+
 import Cocoa
+from PyObjCTools import AppHelper
 
 # Compatibility: Style masks changed naming after macOS 10.12 / PyObjC 5
 if hasattr(Cocoa, "NSWindowStyleMaskBorderless"):
@@ -19,93 +31,122 @@ else:
     BORDERLESS = Cocoa.NSBorderlessWindowMask       # legacy constant
     BACKING    = Cocoa.NSBackingStoreBuffered
 
-TEXT = sys.argv[1] if len(sys.argv) > 1 else "Hello Tooltip"
-DURATION = int(sys.argv[2]) if len(sys.argv) > 2 else 4
 PADDING = 12
-
-# Cursor position (Quartz origin bottom-left) → Cocoa origin top-left
-loc = Cocoa.NSEvent.mouseLocation()
-screen_height = Cocoa.NSScreen.mainScreen().frame().size.height
-x, y = int(loc.x), int(screen_height - loc.y)
-
-# Create window using compatible style mask
-win = Cocoa.NSWindow.alloc().initWithContentRect_styleMask_backing_defer_(
-    Cocoa.NSMakeRect(x, y, 10, 10), BORDERLESS, BACKING, False
-)
-win.setLevel_(Cocoa.NSStatusWindowLevel + 3)
-win.setOpaque_(False)
-win.setBackgroundColor_(Cocoa.NSColor.clearColor())
-win.setIgnoresMouseEvents_(True)
-
-# Text field
-field = Cocoa.NSTextField.alloc().initWithFrame_(Cocoa.NSMakeRect(0, 0, 10, 10))
-field.setStringValue_(TEXT[:200])
-field.setBezeled_(False)
-field.setBordered_(False)
-field.setEditable_(False)
-field.setSelectable_(False)
-field.setBackgroundColor_(Cocoa.NSColor.clearColor())
-field.sizeToFit()
-
-w, h = field.frame().size
-w += PADDING * 2
-h += PADDING * 2
-field.setFrameOrigin_((PADDING, PADDING))
-
-# Reposition window so it is centered horizontally and 16 px above cursor
-new_x = x - w / 2
-new_y = y - h - 16
-win.setFrame_display_(Cocoa.NSMakeRect(new_x, new_y, w, h), True)
-
-# Container view with rounded rectangle background (no quartzPath)
-view = Cocoa.NSView.alloc().initWithFrame_(Cocoa.NSMakeRect(0, 0, w, h))
-view.setWantsLayer_(True)
-layer = view.layer()
-layer.setBackgroundColor_(
-    Cocoa.NSColor.windowBackgroundColor().colorWithAlphaComponent_(0.95).CGColor()
-)
-layer.setCornerRadius_(8.0)
-view.addSubview_(field)
-
-win.setContentSize_((w, h))
-win.setContentView_(view)
-win.orderFrontRegardless()
-
-# Close after DURATION seconds
-Cocoa.NSTimer.scheduledTimerWithTimeInterval_target_selector_userInfo_repeats_(
-    DURATION, win, "close", None, False
-)
-
-# Fade-out: gradually reduce alpha over 0.4 s before closing
-STEP = 0.05
-fade_start = max(DURATION - 0.4, 0)
-
-def fade_tick(timer):
-    alpha = win.alphaValue() - STEP
-    if alpha <= 0:
+FADE_SECS = 0.4
+SOCK_PATH = "/tmp/screenpipe_tooltip.sock"
+
+_windows: set = set()  # open tooltips; keeps each NSWindow alive until it closes
+
+
+def show(text: str, duration: float) -> None:
+    """Open one tooltip near the cursor (main thread only)."""
+    # Cursor position (Quartz origin bottom-left) → Cocoa origin top-left
+    loc = Cocoa.NSEvent.mouseLocation()
+    screen_height = Cocoa.NSScreen.mainScreen().frame().size.height
+    x, y = int(loc.x), int(screen_height - loc.y)
+
+    # Create window using compatible style mask
+    win = Cocoa.NSWindow.alloc().initWithContentRect_styleMask_backing_defer_(
+        Cocoa.NSMakeRect(x, y, 10, 10), BORDERLESS, BACKING, False
+    )
+    win.setReleasedWhenClosed_(False)  # Python owns it via _windows
+    win.setLevel_(Cocoa.NSStatusWindowLevel + 3)
+    win.setOpaque_(False)
+    win.setBackgroundColor_(Cocoa.NSColor.clearColor())
+    win.setIgnoresMouseEvents_(True)
+
+    # Text field
+    field = Cocoa.NSTextField.alloc().initWithFrame_(Cocoa.NSMakeRect(0, 0, 10, 10))
+    field.setStringValue_(text[:200])
+    field.setBezeled_(False)
+    field.setBordered_(False)
+    field.setEditable_(False)
+    field.setSelectable_(False)
+    field.setBackgroundColor_(Cocoa.NSColor.clearColor())
+    field.sizeToFit()
+
+    w, h = field.frame().size
+    w += PADDING * 2
+    h += PADDING * 2
+    field.setFrameOrigin_((PADDING, PADDING))
+
+    # Reposition window so it is centered horizontally and 16 px above cursor
+    new_x = x - w / 2
+    new_y = y - h - 16
+    win.setFrame_display_(Cocoa.NSMakeRect(new_x, new_y, w, h), True)
+
+    # Container view with rounded rectangle background (no quartzPath)
+    view = Cocoa.NSView.alloc().initWithFrame_(Cocoa.NSMakeRect(0, 0, w, h))
+    view.setWantsLayer_(True)
+    layer = view.layer()
+    layer.setBackgroundColor_(
+        Cocoa.NSColor.windowBackgroundColor().colorWithAlphaComponent_(0.95).CGColor()
+    )
+    layer.setCornerRadius_(8.0)
+    view.addSubview_(field)
+
+    win.setContentSize_((w, h))
+    win.setContentView_(view)
+    win.orderFrontRegardless()
+    _windows.add(win)
+
+    def close() -> None:
         win.close()
-        Cocoa.NSTimer.cancelPreviousPerformRequestsWithTarget_(fade_tick)
+        _windows.discard(win)
+
+    # Fade out over the last FADE_SECS, then close
+    AppHelper.callLater(max(duration - FADE_SECS, 0), lambda: win.animator().setAlphaValue_(0.0))
+    AppHelper.callLater(duration, close)
+
+
+# ---------------------------------------------------------------------------
+# Daemon mode
+# ---------------------------------------------------------------------------
+
+def _serve(conn: socket.socket) -> None:
+    """Show a tooltip for each frame from one client until it disconnects."""
+    with conn, conn.makefile("rb") as stream:
+        while len(header := stream.read(4)) == 4:
+            body = stream.read(int.from_bytes(header, "big"))
+            try:
+                msg = json.loads(body)
+            except ValueError:
+                continue                    # bad JSON, ignore
+            text = str(msg.get("text", ""))[:200]
+            AppHelper.callAfter(show, text, float(msg.get("duration") or 4))
+
+
+def _accept(server: socket.socket) -> None:
+    while True:
+        conn, _ = server.accept()
+        threading.Thread(target=_serve, args=(conn,), daemon=True).start()
+
+
+def _listen(path: str) -> socket.socket:
+    # Remove stale socket from previous run
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen()
+    return server
+
+
+def main(argv: list[str]) -> None:
+    app = Cocoa.NSApplication.sharedApplication()
+    if argv[1:2] == ["--daemon"]:
+        app.setActivationPolicy_(Cocoa.NSApplicationActivationPolicyAccessory)  # no Dock icon
+        server = _listen(argv[2] if len(argv) > 2 else SOCK_PATH)
+        threading.Thread(target=_accept, args=(server,), daemon=True).start()
     else:
-        win.setAlphaValue_(alpha)
-
-Cocoa.NSTimer.scheduledTimerWithTimeInterval_target_selector_userInfo_repeats_(
-    fade_start, win, "setAlphaValue_", None, False
-)
-Cocoa.NSTimer.scheduledTimerWithTimeInterval_target_selector_userInfo_repeats_(
-    0.05, None, "fade_tick:", None, True
-)
-
-def finish(_: object | None = None):
-    Cocoa.NSApp.stop_(None)
-
-# timer that closes window already exists – attach finish afterwards
-def close_and_quit(timer):
-    win.close()
-    finish()
+        text = argv[1] if len(argv) > 1 else "Hello Tooltip"
+        duration = int(argv[2]) if len(argv) > 2 else 4
+        show(text, duration)
+        AppHelper.callLater(duration, AppHelper.stopEventLoop)
+    AppHelper.runEventLoop()
 
-# replace the previous close timer line with:
-Cocoa.NSTimer.scheduledTimerWithTimeInterval_target_selector_userInfo_repeats_(
-    DURATION, None, "close_and_quit:", None, False
-)
 
-Cocoa.NSApp.run() 
\ No newline at end of file
+if __name__ == "__main__":
+    main(sys.argv)